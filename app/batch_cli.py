@@ -0,0 +1,86 @@
+"""
+Headless batch runner: score (and optionally tailor) every CV against every job description.
+
+Example:
+    python app/batch_cli.py --cv cvs/ --jd "jds/*.pdf" --out outputs/batch --tailor --export docx pdf
+"""
+import argparse
+import logging
+import os
+import sys
+
+# Add parent directory to path for core imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.applications import DEFAULT_DB_PATH, ApplicationRepository
+from core.batch import collect_files, run_batch
+from core.industry_instructions import industry_instructions
+from core.lexical import LEXICAL_INDEX_PATH, update_lexical_index
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score and tailor CVs against job descriptions in bulk.")
+    parser.add_argument('--cv', nargs='+', required=True, help="CV files, directories or glob patterns")
+    parser.add_argument('--jd', nargs='+', required=True, help="Job description files, directories or glob patterns")
+    parser.add_argument('--out', default='outputs/batch', help="Output directory (results.jsonl is the resume checkpoint)")
+    parser.add_argument('--tailor', action='store_true', help="Tailor each CV with the local LLM")
+    parser.add_argument('--min-probability', type=float, default=0.0,
+                        help="Only tailor pairs scoring at least this probability (0-1)")
+    parser.add_argument('--export', nargs='*', choices=['docx', 'pdf'], default=[],
+                        help="Export tailored CVs in these formats")
+    parser.add_argument('--template', default=None,
+                        help="DOCX template for --export docx (e.g. template/cv_template.docx); default: plain layout")
+    parser.add_argument('--industry', default='General', choices=list(industry_instructions.keys()))
+    parser.add_argument('--language', default='English (UK)')
+    parser.add_argument('--regenerate', action='store_true',
+                        help="Ignore cached LLM answers and generate fresh ones")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument('--cache-dir', default='.cache',
+                        help="Directory for the persistent document and embedding caches ('' disables them)")
+    parser.add_argument('--db', nargs='?', const=DEFAULT_DB_PATH, default=None,
+                        help="Also save processed pairs as applications in this SQLite database "
+                             "(default when given without a path: the app's operationcv.db)")
+    parser.add_argument('--update-idf', action='store_true',
+                        help="Before scoring, add the job descriptions saved in the application database "
+                             "(--db, else the app's) to the keyword-density reference corpus")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.cache_dir:
+        # Read lazily by the core caches; explicit environment settings take precedence
+        os.environ.setdefault('OPERATIONCV_DOCUMENT_CACHE_DB', os.path.join(args.cache_dir, 'documents.db'))
+        os.environ.setdefault('OPERATIONCV_EMBEDDING_CACHE_DB', os.path.join(args.cache_dir, 'embeddings.db'))
+    cv_paths = collect_files(args.cv)
+    jd_paths = collect_files(args.jd)
+    if not cv_paths or not jd_paths:
+        logger.error(f"Nothing to do: found {len(cv_paths)} CV files and {len(jd_paths)} JD files")
+        return 1
+
+    repository = ApplicationRepository(args.db) if args.db else None
+    if args.update_idf:
+        added = update_lexical_index(repository)
+        logger.info(f"Added {added} job descriptions to the keyword reference corpus {LEXICAL_INDEX_PATH}")
+    records = run_batch(
+        cv_paths, jd_paths, args.out,
+        tailor=args.tailor,
+        export_formats=args.export,
+        industry=args.industry,
+        language=args.language,
+        min_probability=args.min_probability,
+        workers=args.workers,
+        refresh=args.regenerate,
+        repository=repository,
+        template=args.template,
+    )
+    errors = sum(1 for r in records if r.get('error'))
+    logger.info(f"Done: {len(records)} pairs scored, {errors} errors. Results in {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
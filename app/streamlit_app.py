@@ -1,15 +1,10 @@
 # --- Imports ---
 import sys
 import os
-import json
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
 import streamlit as st
 import logging
-import sqlite3
-from datetime import datetime
-from docxtpl import DocxTemplate
 
 # Add parent directory to path for core imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -18,11 +13,16 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from core.cv_handler import extract_cv_text, extract_sections
 from core.jd_handler import extract_jd_text
 from core.file_utils import FileManager
-from core.llm_client import ask_local_llm
-from core.save_utils import save_cv_to_docx, save_cv_to_pdf
-from core.prompt_utils import load_prompt
+from core.llm_client import stream_local_llm, extract_section_suggestion
+from core.llm_pool import LLMPool
+from core.llm_cache import get_response_cache
+from core.prompt_budget import SECTION_RESPONSE_TOKENS, JDCompressor, section_requests
 from core.industry_instructions import industry_instructions
 from core.probability import compute_interview_probability
+from core.scorer import score_documents
+from core.embeddings import get_engine, get_cache
+from core.applications import get_repository
+from core.vector_index import get_application_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -88,6 +88,27 @@ with st.sidebar:
     4. Help incorporate key skills and keywords
     """)
     
+    regenerate = st.checkbox("🔄 Regenerate AI suggestions", value=False,
+                             help="Skip cached LLM answers and generate fresh ones")
+
+    with st.expander("⚙️ Embedding cache"):
+        st.json(get_cache().stats())
+    llm_cache = get_response_cache()
+    if llm_cache is not None:
+        with st.expander("⚙️ LLM response cache"):
+            st.json(llm_cache.stats())
+
+    with st.expander("🔎 Search past applications"):
+        history_query = st.text_input("Keywords", key="history_query", placeholder="e.g. Power BI")
+        if history_query.strip():
+            matches = get_repository().search(history_query, limit=10)
+            if not matches:
+                st.caption("No matching applications")
+            for match in matches:
+                st.markdown(f"**{match['job_title'] or 'Untitled'}** · {match['company'] or '—'} · {match['created_at'] or ''}")
+                if match['snippet']:
+                    st.caption(match['snippet'])
+
     st.markdown("---")
     st.caption("⚠️ Disclaimer: This tool uses AI to analyze and generate content. Always review the results carefully.")
 
@@ -97,18 +118,15 @@ jd_file = st.file_uploader("Upload Job Description (PDF, DOCX, or TXT)", type=["
 jd_text_paste = st.text_area("Or paste the Job Description here", height=200)
 
 # Function to safely extract text from files
-def safe_extract_text(file_obj, file_path, is_jd=False):
+def safe_extract_text(file_obj, is_jd=False):
     try:
-        # Create temporary directory if it doesn't exist
-        file_manager._ensure_directories()
-        
-        if file_obj.name.lower().endswith('.pdf'):
-            text = extract_cv_text(file_path)
+        # Parse straight from the upload buffer: no temp file, no copy
+        ext = os.path.splitext(file_obj.name)[1]
+        source = file_obj.getbuffer()
+        if is_jd:
+            text = extract_jd_text(source, ext)
         else:
-            if is_jd and not file_obj.name.lower().endswith((".pdf", ".docx", ".txt")):
-                text = extract_jd_text(file_path)
-            else:
-                text = extract_cv_text(file_path)
+            text = extract_cv_text(source, ext)
         return text
     except Exception as e:
         if "No /Root object!" in str(e):
@@ -122,28 +140,7 @@ def safe_extract_text(file_obj, file_path, is_jd=False):
 def process_uploaded_file(file, is_jd=False):
     """Process an uploaded file and return its text content"""
     try:
-        # Create temporary directory if it doesn't exist
-        file_manager._ensure_directories()
-        
-        # Save the uploaded file
-        temp_path = file_manager.save_uploaded_file(file, 'temp', prefix='temp_')
-        
-        if temp_path:
-            # Extract text from the saved file
-            text = safe_extract_text(file, temp_path, is_jd)
-            
-            try:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Could not remove temporary file {temp_path}: {cleanup_error}")
-            
-            return text
-        else:
-            st.error(f"Failed to save {'job description' if is_jd else 'CV'} file")
-            return None
-            
+        return safe_extract_text(file, is_jd)
     except Exception as e:
         logger.error(f"Error processing uploaded file: {e}")
         st.error(f"Error processing {'job description' if is_jd else 'CV'} file: {str(e)}")
@@ -153,23 +150,26 @@ def process_uploaded_file(file, is_jd=False):
 def analyze_documents(cv_text, jd_text):
     """Analyze CV sections and compute relevance scores against job description."""
     try:
-        prob_details = compute_interview_probability(cv_text, jd_text)
+        engine = get_semantic_model()
+
+        # Extract sections, then embed JD, full CV and sections in one batch
+        sections_dict = extract_sections(cv_text)
+        doc_scores = score_documents(cv_text, jd_text, sections_dict, model=engine)
+
+        prob_details = compute_interview_probability(
+            cv_text, jd_text, semantic_score=(doc_scores['similarity'] + 1) / 2
+        )
         prob_before = prob_details['probability'] if isinstance(prob_details, dict) else prob_details
         st.session_state['prob_before'] = prob_before
         
-        # Extract and analyze sections
-        sections_dict = extract_sections(cv_text)
         section_titles_list = list(sections_dict.keys())
         section_texts = list(sections_dict.values())
         
         if not section_texts:
             return prob_details, None, sections_dict
             
-        # Get semantic similarity scores for each section
-        model = get_semantic_model()
-        jd_emb = model.encode(jd_text, convert_to_tensor=True)
-        cv_embs = model.encode(section_texts, convert_to_tensor=True)
-        scores = util.pytorch_cos_sim(cv_embs, jd_emb).cpu().numpy().flatten()
+        # Semantic similarity scores for each section
+        scores = np.array([doc_scores['section_similarity'][title] for title in section_titles_list])
         
         # Normalize scores to 0-100%
         scores = np.clip((scores + 1) * 50, 0, 100)
@@ -190,28 +190,21 @@ def analyze_documents(cv_text, jd_text):
 # Initialize semantic model
 @st.cache_resource
 def get_semantic_model():
-    """Initialize and cache the semantic similarity model"""
-    return SentenceTransformer('all-MiniLM-L6-v2')
+    """Return the process-wide embedding engine shared with core scoring"""
+    return get_engine()
+
+@st.cache_resource(max_entries=8)
+def get_jd_compressor(jd_text):
+    """Sentence-embedded JD, reused for every section prompt built against it"""
+    return JDCompressor(jd_text, model=get_semantic_model())
 
 # Initialize database and clear temporary files
+@st.cache_resource
 def init_db():
-    """Initialize SQLite database"""
-    conn = sqlite3.connect("operationcv.db")
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS job_applications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        job_title TEXT,
-        company TEXT,
-        industry TEXT,
-        jd_text TEXT,
-        cv_text TEXT,
-        tailored_cv TEXT,
-        prob_before REAL,
-        prob_after REAL,
-        created_at TEXT
-    )''')
-    conn.commit()
-    conn.close()
+    """Open the applications database (schema, indexes and pragmas are set up by the repository)"""
+    return get_repository()
+
+init_db()
 
 # Show original CV analysis as soon as files are uploaded
 if cv_file and (jd_file or jd_text_paste.strip()):
@@ -266,15 +259,43 @@ if cv_file and (jd_file or jd_text_paste.strip()):
                         st.warning("❌ Missing Skills")
                         for skill in prob_details['missing_skills']:
                             st.markdown(f"- {skill}")
+
+                similar = get_application_index().similar(
+                    st.session_state.jd_text, k=3,
+                    columns=['job_title', 'company', 'prob_before', 'prob_after', 'created_at'],
+                )
+                if similar:
+                    st.subheader("Similar Past Applications")
+                    for past in similar:
+                        after = f" → {past['prob_after']:.0%}" if past['prob_after'] is not None else ""
+                        before = f"{past['prob_before']:.0%}" if past['prob_before'] is not None else "—"
+                        st.markdown(f"- **{past['job_title'] or 'Untitled'}** · {past['company'] or '—'} · "
+                                    f"JD similarity {past['similarity']:.0%} · probability {before}{after}")
             
             with tab2:
                 st.subheader("Section-by-Section Analysis")
+                if st.button("⚡ Tailor All Sections", key="tailor_all",
+                             help="Tailor the whole CV in one LLM request; sections it misses are retried in parallel"):
+                    with st.spinner("Tailoring all sections..."):
+                        with LLMPool() as pool:
+                            results = pool.tailor_cv(sections_dict, st.session_state.jd_text, refresh=regenerate,
+                                                     instructions=industry_instructions[industry])
+                    for section_name, outcome in results.items():
+                        if outcome['suggestion']:
+                            st.session_state[f'suggestion_{section_name}'] = outcome['suggestion']
+                        elif outcome['error']:
+                            st.error(f"{section_name}: {outcome['error']}")
+                    st.success(f"✅ Tailored {sum(1 for o in results.values() if o['suggestion'])} of {len(results)} sections")
                 for _, row in analysis_df.iterrows():
                     with st.expander(f"📄 {row['Section']} - Match: {row['Relevance']}%", expanded=True):
                         # Content and Analysis in a cleaner layout
                         st.markdown("### Current Content")
                         st.text_area("", row['Content'], height=150, key=f"content_{row['Section']}")
                         
+                        if st.session_state.get(f"suggestion_{row['Section']}"):
+                            st.markdown("### ✨ Suggested Version")
+                            st.success(st.session_state[f"suggestion_{row['Section']}"])
+                        
                         # Analysis and Actions
                         col1, col2 = st.columns([2, 1])
                         with col1:
@@ -288,37 +309,36 @@ if cv_file and (jd_file or jd_text_paste.strip()):
                             if st.button("🚀 Get AI Analysis", key=f"analyze_{row['Section']}", use_container_width=True):
                                 try:
                                     # Generate tailoring suggestions
-                                    prompt = f"""Analyze this CV section and suggest improvements to match the job description.
-                                    Keep the facts the same but rephrase to highlight relevant experience and skills.
-                                    
-                                    Section: {row['Section']}
-                                    Current Content: {row['Content']}
-                                    
-                                    Job Description: {st.session_state.jd_text}
-                                    """
+                                    # Built from all sections so the shared JD prefix matches other calls for this JD
+                                    request = section_requests(
+                                        sections_dict, st.session_state.jd_text, industry_instructions[industry],
+                                        compressor=get_jd_compressor(st.session_state.jd_text),
+                                    ).get(row['Section'])
+                                    if request is None:
+                                        raise ValueError("This section is empty")
+                                    system_prompt, prompt = request
                                     
-                                    # Get suggestion from LLM and store in session state
-                                    suggestion, _ = ask_local_llm(prompt, temperature=0.7)
-                                    
-                                    # Initialize suggestion content
-                                    suggestion_content = None
+                                    # Stream the suggestion so partial output shows up while it generates
+                                    stream = stream_local_llm(prompt, system_prompt=system_prompt, temperature=0.7,
+                                                              refresh=regenerate, max_tokens=SECTION_RESPONSE_TOKENS)
+                                    live_output = st.empty()
+                                    section_lower = row['Section'].lower()
+                                    for _ in stream:
+                                        partial = next((v for k, v in stream.sections.items() if k.lower() == section_lower), None)
+                                        live_output.info(partial if partial is not None else stream.text)
+                                    suggestion, _ = stream.result()
+                                    live_output.empty()
+                                    if stream.stats.get('ttft_seconds') is not None:
+                                        st.caption(f"⏱️ First token after {stream.stats['ttft_seconds']}s · "
+                                                   f"prefill {stream.stats['prefill_seconds']}s · "
+                                                   f"{stream.stats['tokens_per_second']} tokens/s")
                                     
                                     # Log raw suggestion for debugging
                                     logger.info(f"Raw suggestion from LLM: {suggestion}")
                                     
-                                    # Handle JSON response from LLM client
-                                    if isinstance(suggestion, dict) and 'sections' in suggestion:
-                                        # Try to match section name case-insensitively
-                                        section_lower = row['Section'].lower()
-                                        for k, v in suggestion['sections'].items():
-                                            if k.lower() == section_lower:
-                                                suggestion_content = v
-                                                logger.info(f"Found matching section '{k}' with content: {v[:100]}...")
-                                                break
-                                    # Handle plain text response
-                                    elif isinstance(suggestion, str):
-                                        suggestion_content = suggestion.strip()
-                                        logger.info(f"Using plain text content: {suggestion_content[:100]}...")
+                                    suggestion_content = extract_section_suggestion(suggestion, row['Section'])
+                                    if suggestion_content:
+                                        logger.info(f"Using suggestion content: {suggestion_content[:100]}...")
                                     
                                     # Create a full-width container for suggestions
                                     st.markdown("---")
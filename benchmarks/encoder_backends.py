@@ -0,0 +1,125 @@
+"""
+Embedding backend benchmark: loads the model on each backend in a fresh interpreter and reports
+batch throughput, single-text p50/p95 latency and peak RSS, then checks every backend's vectors
+against the torch backend within core.encoders.TOLERANCE (max 1 - cosine over the corpus).
+
+Usage:
+    python benchmarks/encoder_backends.py [--model all-MiniLM-L6-v2] [--backends torch onnx onnx-int8]
+                                          [--threads 4] [--texts 512] [--batch-size 64] [--requests 200]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np  # noqa: E402
+
+from core.encoders import BACKENDS, TOLERANCE  # noqa: E402
+
+WORDS = ('data analysis python sql stakeholder reporting dashboard governance research policy model '
+         'pipeline delivered improved reduced led team cloud budget strategy European Commission '
+         'experience skills requirements degree years machine learning Power BI Salesforce').split()
+
+
+def corpus(n, seed=0):
+    """CV/JD-like texts from a sentence to a few paragraphs, so batches include long inputs."""
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(WORDS, k=rng.choice([8, 20, 60, 200]))) + '.' for _ in range(n)]
+
+
+def worker(args):
+    """Measure one backend in this process; prints a JSON line and saves the vectors."""
+    from core.encoders import export_onnx, load_encoder
+    if args.prepare:
+        # Export / quantize up front, so torch never loads in the measured ONNX process
+        export_onnx(args.model, quantize=args.worker == 'onnx-int8')
+        return
+    texts = corpus(args.texts)
+    start = time.perf_counter()
+    model = load_encoder(args.model, args.worker, args.threads)
+    load_seconds = time.perf_counter() - start
+    encode = lambda batch, size: model.encode(batch, batch_size=size, convert_to_numpy=True,  # noqa: E731
+                                              normalize_embeddings=True, show_progress_bar=False)
+    encode(texts[:args.batch_size], args.batch_size)  # warm-up
+
+    start = time.perf_counter()
+    vectors = np.asarray(encode(texts, args.batch_size), dtype=np.float32)
+    batch_seconds = time.perf_counter() - start
+
+    latencies = []
+    for text in corpus(args.requests, seed=1):
+        start = time.perf_counter()
+        encode([text], 1)
+        latencies.append(time.perf_counter() - start)
+    np.save(args.out, vectors)
+    print(json.dumps({
+        'backend': args.worker,
+        'load_s': load_seconds,
+        'texts_per_s': len(texts) / batch_seconds,
+        'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+        'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+        # ru_maxrss is KiB on Linux
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--texts', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=200, help="Single-text encodes for the latency percentiles")
+    parser.add_argument('--worker', choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        return worker(args)
+
+    backends = ['torch'] + [b for b in args.backends if b != 'torch']
+    results, vectors = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            out = os.path.join(tmp, f'{backend}.npy')
+            command = [sys.executable, os.path.abspath(__file__), '--worker', backend, '--out', out,
+                       '--model', args.model, '--texts', str(args.texts), '--batch-size', str(args.batch_size),
+                       '--requests', str(args.requests)]
+            if args.threads:
+                command += ['--threads', str(args.threads)]
+            if backend != 'torch':
+                subprocess.run(command + ['--prepare'], cwd=REPO_ROOT, capture_output=True, text=True)
+            run = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+            if run.returncode:
+                print(f"{backend}: failed\n{run.stderr.strip().splitlines()[-1] if run.stderr.strip() else ''}")
+                continue
+            results.append(json.loads(run.stdout.strip().splitlines()[-1]))
+            vectors[backend] = np.load(out)
+
+    print(f"{'backend':<10} {'load s':>7} {'texts/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} "
+          f"{'max 1-cos':>10} {'tolerance':>10}")
+    failed = False
+    for r in results:
+        deviation = tolerance = float('nan')
+        if 'torch' in vectors:
+            deviation = float((1 - (vectors[r['backend']] * vectors['torch']).sum(axis=1)).max())
+            tolerance = TOLERANCE[r['backend']]
+            # Float rounding alone can put torch's own deviation a hair above zero
+            failed |= deviation > max(tolerance, 1e-6)
+        print(f"{r['backend']:<10} {r['load_s']:>7.2f} {r['texts_per_s']:>9.1f} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['rss_mb']:>8.0f} {deviation:>10.2e} {tolerance:>10.0e}")
+    if failed or len(results) < len(backends):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
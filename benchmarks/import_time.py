@@ -0,0 +1,84 @@
+"""
+Import-time benchmark: cold-imports each module in a fresh interpreter and reports
+wall time plus which heavy third-party packages got pulled in.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5] [--top 10] [module ...]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_MODULES = [
+    'core.save_utils',
+    'core.file_utils',
+    'core.llm_client',
+    'core.cv_handler',
+    'core.jd_handler',
+    'core.probability',
+    'core.scorer',
+    'core.batch',
+]
+HEAVY = ['torch', 'sentence_transformers', 'transformers', 'pdfplumber', 'docx', 'docxtpl', 'fpdf', 'jsonschema']
+
+PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    """Median cold import time of module over `repeat` fresh interpreters."""
+    samples, heavy = [], []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        heavy = result['heavy']
+    return statistics.median(samples), heavy
+
+
+def top_imports(module, top):
+    """The `top` slowest imports (cumulative microseconds) reported by -X importtime."""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=0, help="Also list the N slowest nested imports per module")
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<22} {'median ms':>10}  heavy packages loaded")
+    for module in args.modules:
+        seconds, heavy = measure(module, args.repeat)
+        print(f"{module:<22} {seconds * 1000:>10.1f}  {', '.join(heavy) or '-'}")
+        if args.top:
+            for cumulative_us, name in top_imports(module, args.top):
+                print(f"    {cumulative_us / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
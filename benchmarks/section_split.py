@@ -0,0 +1,139 @@
+"""
+Section-splitting microbenchmark: times core.cv_handler.extract_sections against the previous
+per-line regex implementation (kept below as the baseline) on a synthetic CV corpus, and checks
+that both return identical sections.
+
+Usage:
+    python benchmarks/section_split.py [--docs 5000] [--repeat 3] [--seed 0] [--corpus DIR]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from core.cv_handler import extract_sections  # noqa: E402
+from core.save_utils import split_sections  # noqa: E402
+
+HEADERS = [
+    'PROFESSIONAL SUMMARY', 'Experience', 'work experience', 'Education:', 'SKILLS & CERTIFICATIONS',
+    'Technical Skills', 'Projects', 'Languages', 'KEY ACHIEVEMENTS', 'Additional / Extra Curricular Experience',
+    'volunteering', 'References',
+]
+WORDS = ('data analysis python sql stakeholder reporting dashboard governance research policy model '
+         'pipeline delivered improved reduced led team cloud budget strategy 27% 2024 EU KPIs').split()
+
+
+def baseline_extract_sections(cv_text):
+    """extract_sections as it was before core.sections: normalize and regexes rebuilt per call/line."""
+    section_headers = [
+        'professional summary', 'summary', 'profile', 'objective',
+        'experience', 'work experience', 'professional experience', 'additional experience',
+        'education', 'academic background',
+        'skills', 'technical skills', 'core competencies', 'skills & certifications', 'skills and certifications',
+        'certifications', 'projects', 'publications', 'languages', 'interests', 'awards', 'activities',
+        'volunteer', 'volunteering', 'extracurricular', 'extra curricular', 'additional / extra curricular experience',
+        'contact', 'personal information', 'references'
+    ]
+
+    def normalize(header):
+        h = header.lower().replace('&', 'and').replace('/', ' ').replace('-', ' ')
+        h = re.sub(r'[^a-z0-9 ]+', '', h)
+        h = re.sub(r'\s+', ' ', h).strip()
+        return h
+    normalized_headers = {normalize(h): h for h in section_headers}
+    sections, pending = [], []
+    current_name, current_lines = None, []
+    for line in cv_text.splitlines():
+        norm = normalize(line)
+        header = None
+        if norm in normalized_headers:
+            header = normalized_headers[norm].title()
+        else:
+            line_stripped = line.strip()
+            if (
+                len(line_stripped.split()) >= 2 and
+                line_stripped.upper() == line_stripped and
+                re.match(r'^[A-Z0-9 &/().,\'-]+$', line_stripped)
+            ):
+                header = line_stripped.title()
+        if header is None:
+            (pending if current_name is None else current_lines).append(line)
+            continue
+        if current_name is not None:
+            content = '\n'.join(current_lines).strip()
+            if content:
+                sections.append((current_name, content))
+        current_name, current_lines = header, []
+    if current_name is None:
+        return {'Full CV': '\n'.join(pending).strip()}
+    content = '\n'.join(current_lines).strip()
+    if content:
+        sections.append((current_name, content))
+    return dict(sections)
+
+
+def synthetic_cv(rng):
+    """A CV-like document: a contact block, 4-10 sections of bullets and prose, mixed line endings."""
+    lines = [' '.join(rng.choices(WORDS, k=3)).title(), 'Mail: someone@example.com | Phone: +39 000 000']
+    for header in rng.sample(HEADERS, rng.randint(4, 10)):
+        lines.append(header)
+        for _ in range(rng.randint(2, 25)):
+            text = ' '.join(rng.choices(WORDS, k=rng.randint(6, 30)))
+            lines.append(rng.choice(['• ', '- ', '', '   ']) + text)
+            if rng.random() < 0.1:
+                lines.append('')
+    return rng.choice(['\n', '\n', '\r\n']).join(lines)
+
+
+def load_corpus(directory):
+    texts = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as f:
+            texts.append(f.read())
+    return texts
+
+
+def timed(fn, corpus, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus', help="Directory of .txt CVs to use instead of the synthetic corpus")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        rng = random.Random(args.seed)
+        corpus = [synthetic_cv(rng) for _ in range(args.docs)]
+    size_mb = sum(len(t) for t in corpus) / 1e6
+
+    mismatches = sum(baseline_extract_sections(t) != extract_sections(t) for t in corpus)
+    print(f"{len(corpus)} documents, {size_mb:.1f} M chars; mismatches vs baseline: {mismatches}")
+    print(f"{'function':<28} {'best s':>8} {'docs/s':>10} {'MB/s':>8}")
+    for name, fn in [('baseline extract_sections', baseline_extract_sections),
+                     ('extract_sections', extract_sections),
+                     ('split_sections', split_sections)]:
+        seconds = timed(fn, corpus, args.repeat)
+        print(f"{name:<28} {seconds:>8.3f} {len(corpus) / seconds:>10.0f} {size_mb / seconds:>8.1f}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
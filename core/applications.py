@@ -0,0 +1,602 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Absolute, so the app and batch runs share one database whatever the working directory
+DEFAULT_DB_PATH = str(Path(__file__).parent.parent / 'operationcv.db')
+
+COLUMNS = ('job_title', 'company', 'industry', 'jd_text', 'cv_text', 'tailored_cv',
+           'prob_before', 'prob_after', 'created_at', 'batch_key')
+# Columns as written: cv_text is replaced by a cv_hash into cv_texts
+STORED_COLUMNS = tuple(c for c in COLUMNS if c != 'cv_text') + ('cv_hash',)
+INSERT_SQL = (f"INSERT INTO job_applications ({', '.join(STORED_COLUMNS)}) "
+              f"VALUES ({', '.join('?' * len(STORED_COLUMNS))})")
+# Re-saving a batch pair replaces its row in place (same id, original created_at)
+UPSERT_SQL = (f"{INSERT_SQL} ON CONFLICT(batch_key) WHERE batch_key IS NOT NULL DO UPDATE SET "
+              f"{', '.join(f'{c} = excluded.{c}' for c in STORED_COLUMNS if c not in ('created_at', 'batch_key'))} "
+              f"RETURNING id")
+# Columns returned by list(): everything except the large text bodies
+SUMMARY_COLUMNS = ('id', 'job_title', 'company', 'industry', 'prob_before', 'prob_after', 'created_at')
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',       # readers never block the writer
+    'PRAGMA synchronous=NORMAL',     # safe with WAL, one fsync per checkpoint instead of per commit
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',      # 16 MB page cache per connection
+    'PRAGMA mmap_size=134217728',    # 128 MB memory-mapped reads
+    'PRAGMA foreign_keys=ON',
+)
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS job_applications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_title TEXT,
+        company TEXT,
+        industry TEXT,
+        jd_text TEXT,
+        cv_text TEXT,
+        tailored_cv TEXT,
+        prob_before REAL,
+        prob_after REAL,
+        created_at TEXT,
+        cv_hash TEXT,
+        batch_key TEXT
+    )''',
+    # Original CVs, stored once per distinct text however many applications use them
+    '''CREATE TABLE IF NOT EXISTS cv_texts (
+        hash TEXT PRIMARY KEY,
+        body BLOB NOT NULL
+    )''',
+    # Each index ends in created_at (+ implicit rowid) so filtered listings are served in order
+    'CREATE INDEX IF NOT EXISTS idx_applications_created_at ON job_applications(created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_applications_company ON job_applications(company, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_applications_industry ON job_applications(industry, created_at)',
+    # Normalized JD embedding per application, float16 to halve storage (see core.vector_index)
+    '''CREATE TABLE IF NOT EXISTS application_embeddings (
+        application_id INTEGER PRIMARY KEY REFERENCES job_applications(id) ON DELETE CASCADE,
+        model TEXT NOT NULL,
+        dim INTEGER NOT NULL,
+        vector BLOB NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_embeddings_model ON application_embeddings(model, application_id)',
+)
+
+# Columns added after the first release, (table, column, type), created on open when missing
+ADDED_COLUMNS = (
+    ('job_applications', 'batch_key', 'TEXT'),
+    ('application_embeddings', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+)
+# Bumped when the stored representation changes; see ApplicationRepository._migrate_storage
+STORAGE_VERSION = 2
+# Large text columns are stored compressed (see pack_text); cv_text moves to cv_texts
+COMPRESSED_COLUMNS = ('jd_text', 'tailored_cv')
+COMPRESS_MIN_BYTES = 256
+# Read side: the same columns as job_applications, decompressed, with cv_text resolved by hash
+TEXT_VIEW = 'job_applications_text'
+STORAGE_SCHEMA = (
+    'CREATE INDEX IF NOT EXISTS idx_applications_cv_hash ON job_applications(cv_hash)',
+    # One row per batch checkpoint key (core.batch.pair_key), see ApplicationRepository.upsert
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_applications_batch_key ON job_applications(batch_key) '
+    'WHERE batch_key IS NOT NULL',
+    # Every saved embedding takes the next version, so readers can load what changed since they last looked
+    'CREATE INDEX IF NOT EXISTS idx_embeddings_version ON application_embeddings(version)',
+    f'''CREATE VIEW IF NOT EXISTS {TEXT_VIEW} AS
+        SELECT a.id, a.job_title, a.company, a.industry, unpack_text(a.jd_text) AS jd_text,
+               COALESCE(unpack_text(c.body), unpack_text(a.cv_text)) AS cv_text,
+               unpack_text(a.tailored_cv) AS tailored_cv, a.prob_before, a.prob_after, a.created_at, a.cv_hash
+        FROM job_applications a LEFT JOIN cv_texts c ON c.hash = a.cv_hash''',
+)
+
+# External-content FTS5 index over the decompressed text columns (see ApplicationRepository._index_rows)
+FTS_COLUMNS = ('job_title', 'company', 'jd_text', 'cv_text', 'tailored_cv')
+# bm25 column weights, in FTS_COLUMNS order: matches in the title/company rank above body text
+FTS_WEIGHTS = (5.0, 3.0, 1.0, 0.5, 1.0)
+# Not INSERT OR IGNORE: a trigger takes the conflict policy of the statement that fired it (e.g. an upsert)
+_MARK_DIRTY = ('INSERT INTO job_applications_fts_dirty (id) SELECT {row}.id '
+               'WHERE NOT EXISTS (SELECT 1 FROM job_applications_fts_dirty WHERE id = {row}.id);')
+FTS_SCHEMA = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS job_applications_fts USING fts5(
+        {', '.join(FTS_COLUMNS)},
+        content='{TEXT_VIEW}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    # Ids of rows changed since they were last indexed. The triggers are plain SQL, so they also
+    # fire for writes from other SQLite clients; the repository clears the ids it indexes itself
+    'CREATE TABLE IF NOT EXISTS job_applications_fts_dirty (id INTEGER PRIMARY KEY)',
+    f'''CREATE TRIGGER IF NOT EXISTS job_applications_fts_dirty_insert AFTER INSERT ON job_applications BEGIN
+        {_MARK_DIRTY.format(row='new')}
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS job_applications_fts_dirty_update AFTER UPDATE ON job_applications BEGIN
+        {_MARK_DIRTY.format(row='old')}
+        {_MARK_DIRTY.format(row='new')}
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS job_applications_fts_dirty_delete AFTER DELETE ON job_applications BEGIN
+        {_MARK_DIRTY.format(row='old')}
+    END''',
+)
+# Triggers that used to update the index directly. They called unpack_text, which only exists on
+# the repository's own connections, so any write from another SQLite client failed; dropped on open
+LEGACY_FTS_TRIGGERS = ('job_applications_fts_insert', 'job_applications_fts_delete', 'job_applications_fts_update')
+FTS_OBJECTS = tuple(('TRIGGER', name) for name in LEGACY_FTS_TRIGGERS) + (
+    ('TRIGGER', 'job_applications_fts_dirty_insert'), ('TRIGGER', 'job_applications_fts_dirty_update'),
+    ('TRIGGER', 'job_applications_fts_dirty_delete'), ('TABLE', 'job_applications_fts_dirty'),
+    ('TABLE', 'job_applications_fts'),
+)
+
+Cursor = Tuple[str, int]
+
+
+def match_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all of its words, in any order (prefix match on the last)."""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return ''
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _zstd():
+    """zstandard module if installed (optional dependency), else None."""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+# One-byte tag in front of every compressed value; uncompressed values stay TEXT
+ZLIB_TAG = b'Z'
+ZSTD_TAG = b'S'
+CODEC = os.environ.get('OPERATIONCV_DB_COMPRESSION', 'zstd' if _zstd() is not None else 'zlib')
+
+
+def pack_text(text: Optional[str], codec: str = CODEC):
+    """
+    Stored form of a text column: a tagged zstd/zlib BLOB, or the text itself when it is short
+    or does not compress.
+    """
+    if text is None:
+        return None
+    data = text.encode('utf-8')
+    if len(data) < COMPRESS_MIN_BYTES:
+        return text
+    if codec == 'zstd' and _zstd() is not None:
+        packed = ZSTD_TAG + _zstd().ZstdCompressor(level=3).compress(data)
+    else:
+        packed = ZLIB_TAG + zlib.compress(data, 6)
+    return packed if len(packed) < len(data) else text
+
+
+def unpack_text(value) -> Optional[str]:
+    """Inverse of pack_text; plain TEXT (including rows written before compression) passes through."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    tag, payload = value[:1], value[1:]
+    if tag == ZLIB_TAG:
+        return zlib.decompress(payload).decode('utf-8')
+    if tag == ZSTD_TAG:
+        if _zstd() is None:
+            raise RuntimeError("Stored text is zstd-compressed; install the zstandard package to read it")
+        return _zstd().ZstdDecompressor().decompress(payload).decode('utf-8')
+    raise ValueError(f"Unknown stored text encoding: {tag!r}")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class ApplicationRepository:
+    """
+    Storage for saved job applications. Each thread reuses one connection (Streamlit reruns and
+    batch workers run on different threads); writes from batch runs go through executemany in a
+    single transaction. Listings use keyset pagination on (created_at, id), so page N costs the
+    same as page 1. JD and tailored CV text are stored compressed and the original CV once per
+    distinct text (cv_texts); reads go through the job_applications_text view, which
+    decompresses with the unpack_text SQL function registered on every connection.
+
+    Other SQLite clients (the sqlite3 shell, backup tools) can read and write job_applications
+    directly, but not the view: it needs unpack_text, and jd_text / tailored_cv may be
+    compressed BLOBs (see pack_text). The search index is updated by this class; rows other
+    clients insert, update or delete are logged by plain-SQL triggers, and the index is rebuilt
+    on the next open or search.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = os.path.abspath(db_path or os.environ.get('OPERATIONCV_DB', DEFAULT_DB_PATH))
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.has_fts = False
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.init_schema()
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened and configured on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.create_function('unpack_text', 1, unpack_text, deterministic=True)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Commit on success, roll back on error."""
+        conn = self.connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def init_schema(self):
+        with self.transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            if conn.execute('PRAGMA user_version').fetchone()[0] < STORAGE_VERSION:
+                self._migrate_storage(conn)
+            for table, name, kind in ADDED_COLUMNS:
+                if name not in {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}:
+                    conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {kind}')
+            for statement in STORAGE_SCHEMA:
+                conn.execute(statement)
+        self._init_fts()
+
+    def _migrate_storage(self, conn: sqlite3.Connection, batch_size: int = 500):
+        """
+        Upgrade a database written with plain TEXT columns: add cv_hash, move CV text into
+        cv_texts, and compress the JD and tailored CV of every row. The FTS index is dropped
+        here and rebuilt over the view by _init_fts.
+        """
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(job_applications)')}
+        if 'cv_hash' not in columns:
+            conn.execute('ALTER TABLE job_applications ADD COLUMN cv_hash TEXT')
+        for kind, name in FTS_OBJECTS:
+            conn.execute(f'DROP {kind} IF EXISTS {name}')
+        conn.execute(f'DROP VIEW IF EXISTS {TEXT_VIEW}')
+        last_id, migrated = 0, 0
+        while True:
+            rows = conn.execute(
+                'SELECT id, jd_text, cv_text, tailored_cv FROM job_applications WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                cv_text = unpack_text(row['cv_text'])
+                cv_hash = self._store_cv(conn, cv_text)
+                updates.append((pack_text(unpack_text(row['jd_text'])), None if cv_hash else cv_text,
+                                pack_text(unpack_text(row['tailored_cv'])), cv_hash, row['id']))
+            conn.executemany(
+                'UPDATE job_applications SET jd_text = ?, cv_text = ?, tailored_cv = ?, cv_hash = ? WHERE id = ?',
+                updates,
+            )
+            last_id = rows[-1]['id']
+            migrated += len(rows)
+        conn.execute(f'PRAGMA user_version = {STORAGE_VERSION}')
+        if migrated:
+            logger.info(f"Migrated {migrated} applications to compressed storage; run vacuum() to reclaim space")
+
+    @staticmethod
+    def _store_cv(conn: sqlite3.Connection, cv_text: Optional[str]) -> Optional[str]:
+        """Store a CV once by content hash and return the hash (None for a missing CV)."""
+        if not cv_text:
+            return None
+        digest = text_hash(cv_text)
+        conn.execute('INSERT OR IGNORE INTO cv_texts (hash, body) VALUES (?, ?)', (digest, pack_text(cv_text)))
+        return digest
+
+    def _init_fts(self):
+        conn = self.connection()
+        existed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'job_applications_fts'"
+        ).fetchone() is not None
+        with self.transaction() as conn:
+            for name in LEGACY_FTS_TRIGGERS:
+                conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+        try:
+            with self.transaction() as conn:
+                for statement in FTS_SCHEMA:
+                    conn.execute(statement)
+                if not existed:
+                    # Index rows saved before full-text search existed
+                    self._rebuild_fts(conn)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable, search falls back to LIKE scans: {e}")
+            return
+        self.has_fts = True
+        self._sync_fts()
+
+    @staticmethod
+    def _rebuild_fts(conn: sqlite3.Connection):
+        conn.execute("INSERT INTO job_applications_fts(job_applications_fts) VALUES ('rebuild')")
+        conn.execute('DELETE FROM job_applications_fts_dirty')
+
+    def _sync_fts(self):
+        """
+        Rebuild the search index if rows changed without being indexed (written by another
+        client). The old text of such rows is gone, so the index cannot be patched row by row.
+        """
+        if self.connection().execute('SELECT 1 FROM job_applications_fts_dirty LIMIT 1').fetchone() is None:
+            return
+        with self.transaction() as conn:
+            changed = conn.execute('SELECT COUNT(*) FROM job_applications_fts_dirty').fetchone()[0]
+            if changed:
+                logger.info(f"{changed} applications changed outside the repository; rebuilding the search index")
+                self._rebuild_fts(conn)
+
+    def _index_rows(self, conn: sqlite3.Connection, ids: Sequence[int], delete: bool = False):
+        """
+        Add the current text of rows ids to the search index (and mark them in sync) or, with
+        delete, take their current text out of it.
+        """
+        if not self.has_fts:
+            return
+        columns = ', '.join(FTS_COLUMNS)
+        # Stay below SQLite's default limit of 999 bound parameters
+        for start in range(0, len(ids), 900):
+            chunk = list(ids[start:start + 900])
+            where = f"WHERE id IN ({', '.join('?' * len(chunk))})"
+            if delete:
+                conn.execute(f"INSERT INTO job_applications_fts(job_applications_fts, rowid, {columns}) "
+                             f"SELECT 'delete', id, {columns} FROM {TEXT_VIEW} {where}", chunk)
+            else:
+                conn.execute(f"INSERT INTO job_applications_fts(rowid, {columns}) "
+                             f"SELECT id, {columns} FROM {TEXT_VIEW} {where}", chunk)
+                conn.execute(f'DELETE FROM job_applications_fts_dirty {where}', chunk)
+
+    def rebuild_search_index(self):
+        """Re-index every application."""
+        if self.has_fts:
+            with self.transaction() as conn:
+                self._rebuild_fts(conn)
+
+    def _row_values(self, conn: sqlite3.Connection, application: Dict) -> Tuple:
+        values = dict(application)
+        values.setdefault('created_at', _now())
+        values['cv_hash'] = self._store_cv(conn, values.pop('cv_text', None))
+        for column in COMPRESSED_COLUMNS:
+            values[column] = pack_text(values.get(column))
+        return tuple(values.get(column) for column in STORED_COLUMNS)
+
+    def add(self, application: Dict) -> int:
+        """Insert one application (keys from COLUMNS; missing ones are NULL) and return its id."""
+        with self.transaction() as conn:
+            application_id = conn.execute(INSERT_SQL, self._row_values(conn, application)).lastrowid
+            self._index_rows(conn, [application_id])
+            return application_id
+
+    def add_many(self, applications: Iterable[Dict]) -> List[int]:
+        """Insert many applications in one transaction; returns their ids in input order."""
+        with self.transaction() as conn:
+            rows = [self._row_values(conn, a) for a in applications]
+            if not rows:
+                return []
+            conn.executemany(INSERT_SQL, rows)
+            # A single writer inside one transaction gets consecutive AUTOINCREMENT ids
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            ids = list(range(last_id - len(rows) + 1, last_id + 1))
+            self._index_rows(conn, ids)
+        logger.info(f"Saved {len(rows)} applications to {self.db_path}")
+        return ids
+
+    def upsert(self, batch_key: str, application: Dict) -> int:
+        """
+        Save the application of a batch pair under its checkpoint key and return its id. Saving
+        the same key again (a retried or resumed pair) replaces that row instead of adding one.
+        """
+        if self.has_fts:
+            # Taking the old text out of the index assumes the index holds it
+            self._sync_fts()
+        with self.transaction() as conn:
+            previous = conn.execute('SELECT id FROM job_applications WHERE batch_key = ?', (batch_key,)).fetchone()
+            if previous is not None:
+                # The index must be given the old text to remove it
+                self._index_rows(conn, [previous[0]], delete=True)
+            values = self._row_values(conn, {**application, 'batch_key': batch_key})
+            application_id = conn.execute(UPSERT_SQL, values).fetchone()[0]
+            self._index_rows(conn, [application_id])
+            return application_id
+
+    def get(self, application_id: int) -> Optional[Dict]:
+        row = self.connection().execute(f'SELECT * FROM {TEXT_VIEW} WHERE id = ?', (application_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_many(self, application_ids: Sequence[int], columns: Optional[Sequence[str]] = None) -> Dict[int, Dict]:
+        """{id: row} for the ids that exist (all columns unless columns is given)."""
+        selected = ', '.join(['id'] + [c for c in columns if c != 'id']) if columns else '*'
+        out = {}
+        # Stay below SQLite's default limit of 999 bound parameters
+        for start in range(0, len(application_ids), 900):
+            chunk = list(application_ids[start:start + 900])
+            rows = self.connection().execute(
+                f"SELECT {selected} FROM {TEXT_VIEW} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            out.update((row['id'], dict(row)) for row in rows)
+        return out
+
+    def save_embeddings(self, application_ids: Sequence[int], vectors: np.ndarray, model: str):
+        """
+        Store (replace) normalized JD embeddings, one row of vectors per application id. Each
+        row takes the next version number (see load_embeddings).
+        """
+        vectors = np.asarray(vectors, dtype=np.float16)
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO application_embeddings (application_id, model, dim, vector, version) '
+                'VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM application_embeddings))',
+                [(int(i), model, vectors.shape[1], v.tobytes()) for i, v in zip(application_ids, vectors)],
+            )
+
+    def load_embeddings(self, model: str, since: int = -1) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        (ids, float32 matrix, latest version) of the embeddings for model saved or replaced
+        after version since (all of them by default), skipping those of deleted applications.
+        """
+        rows = self.connection().execute(
+            'SELECT e.application_id, e.dim, e.vector, e.version FROM application_embeddings e '
+            'JOIN job_applications a ON a.id = e.application_id '
+            'WHERE e.model = ? AND e.version > ? ORDER BY e.version',
+            (model, since),
+        ).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), since
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        matrix = np.frombuffer(b''.join(row[2] for row in rows), dtype=np.float16).reshape(len(rows), rows[0][1])
+        return ids, matrix.astype(np.float32), rows[-1][3]
+
+    def embedding_count(self, model: str) -> int:
+        """Embeddings stored for model, not counting those of deleted applications."""
+        return self.connection().execute(
+            'SELECT COUNT(*) FROM application_embeddings e JOIN job_applications a ON a.id = e.application_id '
+            'WHERE e.model = ?', (model,)
+        ).fetchone()[0]
+
+    def missing_embeddings(self, model: str, limit: int = 1000) -> List[Tuple[int, str]]:
+        """(id, jd_text) of applications without an embedding for model."""
+        rows = self.connection().execute(
+            f'SELECT a.id, a.jd_text FROM {TEXT_VIEW} a LEFT JOIN application_embeddings e '
+            'ON e.application_id = a.id AND e.model = ? '
+            "WHERE e.application_id IS NULL AND a.jd_text IS NOT NULL AND a.jd_text != '' "
+            'ORDER BY a.id LIMIT ?',
+            (model, limit),
+        ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    @staticmethod
+    def _filters(company: Optional[str], industry: Optional[str]) -> Tuple[List[str], List]:
+        clauses, params = [], []
+        if company is not None:
+            clauses.append('company = ?')
+            params.append(company)
+        if industry is not None:
+            clauses.append('industry = ?')
+            params.append(industry)
+        return clauses, params
+
+    def list(self, limit: int = 50, after: Optional[Cursor] = None, company: Optional[str] = None,
+             industry: Optional[str] = None, columns: Sequence[str] = SUMMARY_COLUMNS) -> Dict:
+        """
+        Newest applications first. Pass the returned next_cursor as after to get the next page;
+        it is None on the last page. Returns {'items': [...], 'next_cursor': (created_at, id) or None}.
+        """
+        clauses, params = self._filters(company, industry)
+        if after is not None:
+            clauses.append('(created_at, id) < (?, ?)')
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        columns = list(columns)
+        # The cursor needs created_at and id even when the caller did not ask for them
+        selected = columns + [c for c in ('created_at', 'id') if c not in columns]
+        rows = self.connection().execute(
+            f"SELECT {', '.join(selected)} FROM {TEXT_VIEW} {where} "
+            f"ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+        next_cursor = (rows[limit - 1]['created_at'], rows[limit - 1]['id']) if len(rows) > limit else None
+        return {'items': [{c: row[c] for c in columns} for row in rows[:limit]], 'next_cursor': next_cursor}
+
+    def search(self, query: str, limit: int = 20, company: Optional[str] = None, industry: Optional[str] = None,
+               raw: bool = False, snippet_tokens: int = 12) -> List[Dict]:
+        """
+        Applications matching query, best first (bm25, title and company weighted up), each with
+        a 'snippet' around the match ([...] marks hits). Free text matches all words; pass
+        raw=True to use FTS5 query syntax (OR, NEAR, "phrases", column filters) directly.
+        """
+        if not self.has_fts:
+            return self._search_like(query, limit, company, industry)
+        self._sync_fts()
+        fts_query = query if raw else match_query(query)
+        if not fts_query:
+            return []
+        clauses, params = self._filters(company, industry)
+        where = ''.join(f' AND a.{clause}' for clause in clauses)
+        summary = ', '.join(f'a.{c}' for c in SUMMARY_COLUMNS)
+        rows = self.connection().execute(
+            f"""SELECT {summary},
+                       bm25(job_applications_fts, {', '.join(map(str, FTS_WEIGHTS))}) AS rank,
+                       snippet(job_applications_fts, -1, '[', ']', '…', ?) AS snippet
+                FROM job_applications_fts f
+                JOIN job_applications a ON a.id = f.rowid
+                WHERE job_applications_fts MATCH ?{where}
+                ORDER BY rank LIMIT ?""",
+            [snippet_tokens, fts_query] + params + [limit],
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _search_like(self, query: str, limit: int, company: Optional[str], industry: Optional[str]) -> List[Dict]:
+        words = re.findall(r'\w+', query)
+        if not words:
+            return []
+        clauses, params = self._filters(company, industry)
+        for word in words:
+            clauses.append('(' + ' OR '.join(f'{c} LIKE ?' for c in FTS_COLUMNS) + ')')
+            params.extend([f'%{word}%'] * len(FTS_COLUMNS))
+        rows = self.connection().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM {TEXT_VIEW} WHERE {' AND '.join(clauses)} "
+            f"ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        return [{**dict(row), 'rank': None, 'snippet': None} for row in rows]
+
+    def count(self, company: Optional[str] = None, industry: Optional[str] = None) -> int:
+        clauses, params = self._filters(company, industry)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self.connection().execute(f'SELECT COUNT(*) FROM job_applications {where}', params).fetchone()[0]
+
+    def vacuum(self):
+        """Drop CVs no application refers to any more and compact the database file."""
+        with self.transaction() as conn:
+            removed = conn.execute(
+                'DELETE FROM cv_texts WHERE hash NOT IN '
+                '(SELECT cv_hash FROM job_applications WHERE cv_hash IS NOT NULL)'
+            ).rowcount
+        self.connection().execute('VACUUM')
+        logger.info(f"Vacuumed {self.db_path} (removed {removed} unused CVs)")
+
+    def close(self):
+        """Close every connection opened by this repository."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_repository: Optional[ApplicationRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> ApplicationRepository:
+    """Process-wide repository for OPERATIONCV_DB (default: operationcv.db in the project root)."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = ApplicationRepository()
+    return _repository
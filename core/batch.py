@@ -0,0 +1,305 @@
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.applications import ApplicationRepository
+from core.cv_handler import extract_cv_text, extract_sections
+from core.industry_instructions import industry_instructions
+from core.llm_pool import LLMPool
+from core.probability import compute_interview_probability, compute_probability_matrix
+from core.prompt_utils import load_prompt
+from core.export import export_many
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+SYSTEM_PROMPT_PATH = Path(__file__).parent.parent / 'prompts' / 'cv_tailor_system.txt'
+EXPORT_PENDING = 'export pending'
+CSV_FIELDS = [
+    'cv_path', 'jd_path', 'probability', 'semantic_score', 'skill_coverage', 'keyword_density',
+    'prob_after', 'matching_skills', 'missing_skills', 'outputs', 'error',
+]
+
+
+def collect_files(patterns: Iterable[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of supported document paths."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = glob.glob(os.path.join(pattern, '**', '*'), recursive=True)
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        for path in candidates:
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS:
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def _parse_one(path: str) -> Tuple[str, Optional[str], Optional[str]]:
+    try:
+        return path, extract_cv_text(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def parse_documents(paths: List[str], workers: Optional[int] = None) -> Dict[str, str]:
+    """Extract text from many files in parallel processes; unreadable files are logged and skipped."""
+    texts = {}
+    if not paths:
+        return texts
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, text, error in pool.map(_parse_one, paths, chunksize=4):
+            if error:
+                logger.error(f"Could not parse {path}: {error}")
+            elif text and text.strip():
+                texts[path] = text
+            else:
+                logger.warning(f"No text extracted from {path}")
+    return texts
+
+
+def content_hash(text: str) -> str:
+    """Short content hash used to identify a document across runs."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def pair_key(cv_path: str, cv_text: str, jd_path: str, jd_text: str, options: Dict) -> str:
+    """
+    Checkpoint key of a CV x JD pair under the given run options: two files with the same
+    content stay separate pairs, and a rerun with other options (e.g. --tailor after a
+    score-only run) processes the pair again.
+    """
+    return ':'.join([
+        content_hash(f"{cv_path}\n{cv_text}"),
+        content_hash(f"{jd_path}\n{jd_text}"),
+        content_hash(json.dumps(options, sort_keys=True)),
+    ])
+
+
+def run_options(tailor: bool, export_formats: Iterable[str], template: Optional[str], industry: str,
+                language: str, min_probability: float) -> Dict:
+    """The run settings that shape a pair's record; score-only runs depend on none of them."""
+    if not tailor:
+        return {'tailor': False}
+    formats = sorted(set(export_formats))
+    return {
+        'tailor': True,
+        'min_probability': min_probability,
+        'industry': industry,
+        'language': language,
+        'export': formats,
+        'template': os.path.abspath(template) if template and 'docx' in formats else None,
+    }
+
+
+class Checkpoint:
+    """
+    Append-only JSONL result log that doubles as the resume checkpoint.
+    Each record is fsynced as it is written, so a crash loses at most the pair in flight.
+    When a key appears more than once, the latest record wins.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partial trailing line from an interrupted write
+                        continue
+                    self.done[record['key']] = record
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def __contains__(self, key: str) -> bool:
+        # Pairs that failed last time are retried
+        record = self.done.get(key)
+        return record is not None and not record.get('error')
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done[record['key']] = record
+
+    def close(self):
+        self._file.close()
+
+
+def sections_to_text(sections: Dict[str, str]) -> str:
+    """Join {section: content} back into CV text, each section under an upper-case header."""
+    return '\n\n'.join(content.strip() if title == 'Full CV' else f"{title.upper()}\n{content.strip()}"
+                       for title, content in sections.items() if content.strip())
+
+
+def tailor_cv(cv_text: str, jd_text: str, industry: str = 'General', language: str = 'English (UK)',
+              refresh: bool = False, pool: Optional[LLMPool] = None) -> str:
+    """
+    Tailor the whole CV with LLMPool.tailor_cv, so the prompt fits the context window and
+    sections the answer misses are retried one by one. A section that still fails keeps its
+    original text; if every section fails, the first error is raised.
+    """
+    sections = extract_sections(cv_text)
+    instructions = f"{industry_instructions.get(industry, industry_instructions['General'])}\nOutput language: {language}"
+    owned = pool is None
+    pool = pool or LLMPool()
+    try:
+        results = pool.tailor_cv(sections, jd_text, system_prompt=load_prompt(SYSTEM_PROMPT_PATH),
+                                 refresh=refresh, instructions=instructions)
+    finally:
+        if owned:
+            pool.close()
+    if results and not any(outcome['suggestion'] for outcome in results.values()):
+        raise RuntimeError(next((o['error'] for o in results.values() if o['error']), 'no section was tailored'))
+    failed = [name for name, outcome in results.items() if not outcome['suggestion']]
+    if failed:
+        logger.warning(f"Kept the original text of sections {failed}: tailoring them failed")
+    return sections_to_text({name: (results[name]['suggestion'] if name in results and results[name]['suggestion']
+                                    else content)
+                             for name, content in sections.items()})
+
+
+def _output_name(cv_path: str, jd_path: str) -> str:
+    return f"tailored_cv_{Path(cv_path).stem}_{Path(jd_path).stem}"
+
+
+def run_batch(cv_paths: List[str], jd_paths: List[str], output_dir: str, tailor: bool = False,
+              export_formats: Iterable[str] = (), industry: str = 'General', language: str = 'English (UK)',
+              min_probability: float = 0.0, workers: Optional[int] = None, refresh: bool = False,
+              repository: Optional[ApplicationRepository] = None, template: Optional[str] = None) -> List[Dict]:
+    """
+    Score every CV x JD pair, optionally tailor and export, and record results in
+    output_dir/results.jsonl (resumable) and output_dir/results.csv. With a repository, each
+    pair is also saved as an application as it is checkpointed, under its checkpoint key, so
+    a resumed or retried pair replaces its earlier row.
+    Pairs are tailored concurrently through one LLMPool; the tailored CV is kept in the
+    record's tailored_cv field, and a retried pair whose tailoring already succeeded reuses it.
+    Exports run together after tailoring (see core.export.export_many); DOCX files use
+    template when given, else a plain layout.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cv_texts = parse_documents(cv_paths, workers)
+    jd_texts = parse_documents(jd_paths, workers)
+    logger.info(f"Parsed {len(cv_texts)} CVs and {len(jd_texts)} job descriptions")
+
+    matrix = compute_probability_matrix(cv_texts, jd_texts)
+    checkpoint = Checkpoint(os.path.join(output_dir, 'results.jsonl'))
+    options = run_options(tailor, export_formats, template, industry, language, min_probability)
+    skipped = 0
+    keys = set()
+    pending_exports = []
+    index = None
+    if repository is not None:
+        from core.vector_index import ApplicationIndex
+        index = ApplicationIndex(repository)
+
+    def save(record: Dict, tailored_text: Optional[str]):
+        """Store the pair's application (replacing an earlier attempt at it), then checkpoint the record."""
+        if repository is not None:
+            jd_text = jd_texts[record['jd_path']]
+            application_id = repository.upsert(record['key'], {
+                'job_title': Path(record['jd_path']).stem,
+                'industry': industry,
+                'jd_text': jd_text,
+                'cv_text': cv_texts[record['cv_path']],
+                'tailored_cv': tailored_text,
+                'prob_before': record['probability'],
+                'prob_after': record['prob_after'],
+            })
+            index.add([application_id], [jd_text])
+        checkpoint.write(record)
+
+    pool = LLMPool() if tailor else None
+    tailoring = ThreadPoolExecutor(max_workers=pool.max_concurrency, thread_name_prefix='tailor') if tailor else None
+
+    def finish(record: Dict, tailored) -> None:
+        """Resolve the pair's tailoring, then checkpoint it (and save it once its exports are done)."""
+        if isinstance(tailored, Future):
+            try:
+                record['tailored_cv'] = tailored.result()
+                record['prob_after'] = compute_interview_probability(
+                    record['tailored_cv'], jd_texts[record['jd_path']])['probability']
+            except Exception as e:
+                logger.error(f"Tailoring failed for {record['cv_path']} x {record['jd_path']}: {e}")
+                record['error'] = str(e)
+        if record['tailored_cv'] is not None and export_formats:
+            # Checkpointed as failed until the export completes, so an interrupted run retries it
+            record['error'] = EXPORT_PENDING
+            pending_exports.append((record, record['tailored_cv'], os.path.join(
+                output_dir, _output_name(record['cv_path'], record['jd_path']))))
+            # The application is saved by _export_pending, once the record has its final state
+            checkpoint.write(record)
+        else:
+            save(record, record['tailored_cv'])
+
+    try:
+        queued = []
+        for result in matrix['ranking']:
+            cv_path, jd_path = result.pop('cv_id'), result.pop('jd_id')
+            key = pair_key(cv_path, cv_texts[cv_path], jd_path, jd_texts[jd_path], options)
+            keys.add(key)
+            if key in checkpoint:
+                skipped += 1
+                continue
+            previous = checkpoint.done.get(key) or {}
+            record = {'key': key, 'cv_path': cv_path, 'jd_path': jd_path, **result,
+                      'prob_after': None, 'tailored_cv': None, 'outputs': [], 'error': None}
+            tailored = None
+            if tailor and result['probability'] >= min_probability:
+                if previous.get('tailored_cv'):
+                    # Tailored last time; only its export failed or was interrupted
+                    record['tailored_cv'], record['prob_after'] = previous['tailored_cv'], previous['prob_after']
+                else:
+                    tailored = tailoring.submit(tailor_cv, cv_texts[cv_path], jd_texts[jd_path], industry,
+                                                language, refresh, pool)
+            queued.append((record, tailored))
+        for record, tailored in queued:
+            finish(record, tailored)
+        if pending_exports:
+            _export_pending(pending_exports, export_formats, template, workers, save)
+    finally:
+        if tailor:
+            tailoring.shutdown(wait=True, cancel_futures=True)
+            pool.close()
+        checkpoint.close()
+    if skipped:
+        logger.info(f"Resumed from checkpoint: skipped {skipped} already processed pairs")
+
+    records = sorted((checkpoint.done[k] for k in keys), key=lambda r: r['probability'], reverse=True)
+    write_csv(records, os.path.join(output_dir, 'results.csv'))
+    return records
+
+
+def _export_pending(pending: List[Tuple[Dict, str, str]], export_formats: Iterable[str], template: Optional[str],
+                    workers: Optional[int], save: Callable[[Dict, Optional[str]], None]):
+    """Export all tailored CVs of a run in one pool, then save each record with its final outputs."""
+    formats = [fmt for fmt in ('docx', 'pdf') if fmt in export_formats]
+    jobs = [(text, f"{base}.{fmt}") for _, text, base in pending for fmt in formats]
+    results = iter(export_many(jobs, template=template, workers=workers))
+    for record, text, _ in pending:
+        outcomes = [next(results) for _ in formats]
+        record['outputs'] = [o['path'] for o in outcomes if o['error'] is None]
+        errors = [f"{os.path.basename(o['path'])}: {o['error']}" for o in outcomes if o['error'] is not None]
+        record['error'] = '; '.join(errors) or None
+        save(record, text)
+
+
+def write_csv(records: List[Dict], path: str):
+    """Write result records as CSV, joining list fields with '; '."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            row = dict(record)
+            for field in ('matching_skills', 'missing_skills', 'outputs'):
+                row[field] = '; '.join(row.get(field) or [])
+            writer.writerow(row)
@@ -0,0 +1,110 @@
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.sections import detect_header
+
+POOLING_MODES = ('mean', 'max', 'attention')
+# Softmax temperature of attention pooling over chunk/query cosine similarities
+ATTENTION_TEMPERATURE = 0.1
+_SENTENCE_END = re.compile(r'(?<=[.!?;])\s+')
+
+# Token counts for a list of texts, without special tokens
+TokenCounts = Callable[[List[str]], List[int]]
+
+
+def _units(text: str) -> List[Tuple[str, bool]]:
+    """(sentence, starts a section) pairs: sentences within each non-empty line, headers flagged."""
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        header = detect_header(line) is not None
+        for i, sentence in enumerate(s for s in _SENTENCE_END.split(line) if s):
+            units.append((sentence, header and i == 0))
+    return units
+
+
+def _split_long(unit: str, max_tokens: int, count_tokens: TokenCounts, used: int = 0) -> List[Tuple[str, int]]:
+    """
+    Word-wise split of a single sentence longer than max_tokens. The first piece leaves room
+    for used tokens already in its chunk; token counts are those of the pieces alone.
+    """
+    words = unit.split()
+    pieces, current, size = [], [], 0
+    for word, tokens in zip(words, count_tokens(words)):
+        if current and used + size + tokens > max_tokens:
+            pieces.append((' '.join(current), size))
+            current, size, used = [], 0, 0
+        current.append(word)
+        size += tokens
+    if current:
+        pieces.append((' '.join(current), size))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int, count_tokens: TokenCounts) -> List[Tuple[str, int]]:
+    """
+    Split text into (chunk, token count) windows of at most max_tokens, packing whole sentences
+    and starting a new window at each section header. Text that already fits is returned as is.
+    """
+    units = _units(text)
+    counts = count_tokens([text] + [u for u, _ in units])
+    if counts[0] <= max_tokens or not units:
+        return [(text, counts[0])]
+    chunks, current, used = [], [], 0
+    header_only = False
+
+    def flush():
+        if current:
+            chunks.append(('\n'.join(current), used))
+
+    for (unit, header), tokens in zip(units, counts[1:]):
+        # A header directly followed by an over-long sentence goes into that sentence's first piece
+        carry = header_only and tokens > max_tokens and not header
+        if current and not carry and (header or used + tokens > max_tokens):
+            flush()
+            current, used = [], 0
+        if tokens > max_tokens:
+            pieces = _split_long(unit, max_tokens, count_tokens, used)
+            if current:
+                first, first_tokens = pieces[0]
+                pieces[0] = ('\n'.join(current + [first]), used + first_tokens)
+                current, used = [], 0
+            chunks.extend(pieces[:-1])
+            unit, tokens = pieces[-1]
+        current.append(unit)
+        used += tokens
+        header_only = header and len(current) == 1
+    flush()
+    return chunks
+
+
+def pool_chunks(vectors: np.ndarray, weights: Sequence[float], mode: str = 'mean',
+                query: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    One L2-normalized document vector from its chunk vectors (rows):
+      - 'mean': average weighted by each chunk's token count
+      - 'max': element-wise maximum
+      - 'attention': token-weighted average with softmax weights on each chunk's similarity to
+        query (e.g. the JD vector), or to the document's mean vector without one
+    """
+    if mode not in POOLING_MODES:
+        raise ValueError(f"Unknown pooling mode: {mode}")
+    if len(vectors) == 1:
+        return vectors[0]
+    weights = np.asarray(weights, dtype=np.float32)
+    weights = weights / max(float(weights.sum()), 1e-12)
+    if mode == 'max':
+        pooled = vectors.max(axis=0)
+    else:
+        if mode == 'attention':
+            if query is None:
+                query = weights @ vectors
+            scores = vectors @ query / ATTENTION_TEMPERATURE
+            attention = np.exp(scores - scores.max()) * weights
+            weights = attention / attention.sum()
+        pooled = weights @ vectors
+    return (pooled / max(float(np.linalg.norm(pooled)), 1e-12)).astype(np.float32)
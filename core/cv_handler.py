@@ -1,85 +1,88 @@
-import pdfplumber
-import docx
-import os
-import re
-from typing import Dict
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
-def extract_text_from_pdf(path):
-    """Extract text from a PDF file using pdfplumber."""
-    with pdfplumber.open(path) as pdf:
-        return "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
+from core.document_cache import buffer_digest, file_digest, get_document_cache
+from core.extraction import (
+    BUFFER_TYPES,
+    Source,
+    extract_text,
+    extract_text_from_docx,
+    extract_text_from_pdf,
+    extract_text_from_txt,
+    is_path,
+    iter_text_lines,
+    source_extension,
+)
+from core.sections import detect_header, find_sections, section_text
 
-def extract_text_from_docx(path):
-    """Extract text from a DOCX file using python-docx."""
-    doc = docx.Document(path)
-    return "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+def _source_digest(source: Source, ext: str) -> str:
+    if is_path(source):
+        return file_digest(source, ext)
+    if isinstance(source, BUFFER_TYPES):
+        return buffer_digest(source, ext)
+    if hasattr(source, 'getbuffer'):
+        return buffer_digest(source.getbuffer(), ext)
+    source.seek(0)
+    return buffer_digest(source.read(), ext)
 
-def extract_text_from_txt(path):
-    """Extract text from a TXT file."""
-    with open(path, 'r', encoding='utf-8') as f:
-        return f.read()
+def load_document(source: Source, ext: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+    """
+    Return (text, sections) for a document, parsing it only if its content hash is not cached.
+    source may be a path or an in-memory upload (see core.extraction.extract_text).
+    """
+    ext = source_extension(source, ext)
+    cache = get_document_cache()
+    digest = _source_digest(source, ext)
+    cached = cache.get(digest)
+    if cached is not None:
+        return cached
+    text = extract_text(source, ext)
+    sections = extract_sections(text)
+    cache.put(digest, text, sections)
+    return text, sections
 
-def extract_cv_text(path):
+def extract_cv_text(source: Source, ext: Optional[str] = None):
     """Detect file type and extract text from CV."""
-    ext = os.path.splitext(path)[1].lower()
-    if ext == '.pdf':
-        return extract_text_from_pdf(path)
-    elif ext == '.docx':
-        return extract_text_from_docx(path)
-    elif ext == '.txt':
-        return extract_text_from_txt(path)
-    else:
-        raise ValueError(f"Unsupported file type: {ext}")
+    return load_document(source, ext)[0]
+
+def iter_sections(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (section_name, content) pairs from a stream of lines, emitting each section as soon as
+    the next header (or the end of input) is reached. Header rules are those of extract_sections.
+    """
+    pending = []  # Lines seen before the first header
+    current_name, current_lines = None, []
+    for line in lines:
+        header = detect_header(line)
+        if header is None:
+            (pending if current_name is None else current_lines).append(line)
+            continue
+        if current_name is not None:
+            content = '\n'.join(current_lines).strip()
+            if content:
+                yield current_name, content
+        current_name, current_lines = header, []
+        pending = None
+    if current_name is None:
+        yield 'Full CV', '\n'.join(pending).strip()
+        return
+    content = '\n'.join(current_lines).strip()
+    if content:
+        yield current_name, content
 
 def extract_sections(cv_text: str) -> Dict[str, str]:
     """
     Hybrid: Extracts sections by scanning for known headers (any case) and any ALL CAPS line with 2+ words.
     This is robust for CVs with custom or standard all-caps section headers.
+    Built on core.sections.find_sections, which returns offsets rather than copied lines.
     """
-    section_headers = [
-        'professional summary', 'summary', 'profile', 'objective',
-        'experience', 'work experience', 'professional experience', 'additional experience',
-        'education', 'academic background',
-        'skills', 'technical skills', 'core competencies', 'skills & certifications', 'skills and certifications',
-        'certifications', 'projects', 'publications', 'languages', 'interests', 'awards', 'activities',
-        'volunteer', 'volunteering', 'extracurricular', 'extra curricular', 'additional / extra curricular experience',
-        'contact', 'personal information', 'references'
-    ]
-    def normalize(header):
-        h = header.lower().replace('&', 'and').replace('/', ' ').replace('-', ' ')
-        h = re.sub(r'[^a-z0-9 ]+', '', h)
-        h = re.sub(r'\s+', ' ', h).strip()
-        return h
-    normalized_headers = {normalize(h): h for h in section_headers}
-    lines = cv_text.splitlines()
-    section_indices = []
-    for idx, line in enumerate(lines):
-        norm = normalize(line)
-        # Known header match (any case)
-        if norm in normalized_headers:
-            section_indices.append((idx, normalized_headers[norm].title()))
-            continue
-        # ALL CAPS, 2+ words, mostly letters/numbers/symbols
-        line_stripped = line.strip()
-        if (
-            len(line_stripped.split()) >= 2 and
-            line_stripped.upper() == line_stripped and
-            re.match(r'^[A-Z0-9 &/().,\'-]+$', line_stripped)
-        ):
-            section_indices.append((idx, line_stripped.title()))
-    if not section_indices:
-        return {'Full CV': cv_text.strip()}
-    sections = {}
-    for i, (start_idx, section_name) in enumerate(section_indices):
-        end_idx = section_indices[i+1][0] if i+1 < len(section_indices) else len(lines)
-        content = '\n'.join(lines[start_idx+1:end_idx]).strip()
-        if content:
-            sections[section_name] = content
-    return sections
+    return {span.name: section_text(cv_text, span) for span in find_sections(cv_text)}
+
+def iter_file_sections(source: Source, ext: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Stream sections from a CV file; PDF sections are yielded before later pages are parsed."""
+    return iter_sections(iter_text_lines(source, ext))
 
-def parse_cv_file(file_path: str) -> Dict[str, str]:
+def parse_cv_file(source: Source, ext: Optional[str] = None) -> Dict[str, str]:
     """
     Parses a CV file and returns a dict of section_name: section_content.
     """
-    cv_text = extract_cv_text(file_path)
-    return extract_sections(cv_text)
\ No newline at end of file
+    return load_document(source, ext)[1]
\ No newline at end of file
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from core.extraction import EXTRACTION_VERSION
+from core.sections import SECTIONS_VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DB_BYTES = 512 * 1024 * 1024
+
+Entry = Tuple[str, Dict[str, str]]
+# Salted into every key, so neither tier serves the output of an older parser
+PARSER_VERSION = f"extraction-{EXTRACTION_VERSION}/sections-{SECTIONS_VERSION}"
+
+
+def _hasher(ext: str):
+    return hashlib.sha256(f"{PARSER_VERSION}\n{ext.lower()}\n".encode('utf-8'))
+
+
+def file_digest(path: str, ext: Optional[str] = None) -> str:
+    """
+    SHA-256 of the file bytes, salted with the extension that selects the parser (ext when
+    given, else the path's) and PARSER_VERSION.
+    """
+    h = _hasher(ext if ext is not None else os.path.splitext(path)[1])
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def buffer_digest(buffer, ext: str) -> str:
+    """Same digest as file_digest, for an in-memory bytes-like buffer (hashed in place)."""
+    h = _hasher(ext)
+    h.update(buffer)
+    return h.hexdigest()
+
+
+class DocumentCache:
+    """
+    Cache of parsed documents (extracted text + extract_sections output) keyed by content digest.
+    A byte-bounded in-memory LRU sits in front of an optional, also byte-bounded, SQLite file
+    so batch runs can skip parsing documents seen in earlier runs.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, db_path: Optional[str] = None,
+                 max_db_bytes: int = DEFAULT_MAX_DB_BYTES):
+        self.max_bytes = max_bytes
+        self.max_db_bytes = max_db_bytes
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[str, str, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Batch parsing writes from several processes; wait for the lock instead of failing
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS documents (
+            digest TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            sections TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        )''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_documents_last_used ON documents(last_used)')
+        self._conn.commit()
+
+    def _remember(self, digest: str, text: str, sections_json: str, size: int):
+        old = self._memory.pop(digest, None)
+        if old is not None:
+            self._memory_bytes -= old[2]
+        self._memory[digest] = (text, sections_json, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, (_, _, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    def get(self, digest: str) -> Optional[Entry]:
+        """Return (text, sections) for a digest, or None."""
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                self._memory.move_to_end(digest)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    'SELECT text, sections, size FROM documents WHERE digest = ?', (digest,)
+                ).fetchone()
+                if row is not None:
+                    entry = row
+                    self._remember(digest, *row)
+                    self._conn.execute('UPDATE documents SET last_used = ? WHERE digest = ?', (time.time(), digest))
+                    self._conn.commit()
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Hand out a fresh dict so callers cannot mutate the cached copy
+        return entry[0], json.loads(entry[1])
+
+    def put(self, digest: str, text: str, sections: Dict[str, str]):
+        """Store a parsed document in both tiers, evicting least recently used entries."""
+        sections_json = json.dumps(sections, ensure_ascii=False)
+        size = len(text.encode('utf-8')) + len(sections_json.encode('utf-8'))
+        with self._lock:
+            self._remember(digest, text, sections_json, size)
+            if self._conn is not None:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO documents (digest, text, sections, size, last_used) VALUES (?, ?, ?, ?, ?)',
+                    (digest, text, sections_json, size, time.time()),
+                )
+                self._evict_disk()
+                self._conn.commit()
+
+    def _evict_disk(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM documents').fetchone()[0]
+        if total <= self.max_db_bytes:
+            return
+        excess = total - self.max_db_bytes
+        freed = 0
+        victims = []
+        for digest, size in self._conn.execute('SELECT digest, size FROM documents ORDER BY last_used').fetchall():
+            victims.append((digest,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany('DELETE FROM documents WHERE digest = ?', victims)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current in-memory footprint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'memory_items': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+            }
+
+
+_cache: Optional[DocumentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_document_cache() -> DocumentCache:
+    """Process-wide document cache; OPERATIONCV_DOCUMENT_CACHE_DB enables the on-disk tier."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DocumentCache(
+                    max_bytes=int(os.environ.get('OPERATIONCV_DOCUMENT_CACHE_BYTES', DEFAULT_MAX_BYTES)),
+                    db_path=os.environ.get('OPERATIONCV_DOCUMENT_CACHE_DB') or None,
+                )
+    return _cache
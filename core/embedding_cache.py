@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ITEMS = 4096
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace; BERT-style tokenizers split on it anyway, so embeddings are unchanged."""
+    return ' '.join(text.split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Content address of an embedding: sha256 of model name + normalized text."""
+    h = hashlib.sha256()
+    h.update(model_name.encode('utf-8'))
+    h.update(b'\0')
+    h.update(normalize_text(text).encode('utf-8'))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: a bounded in-memory LRU in front of an optional SQLite file.
+    Vectors are stored as float32 and keyed by cache_key().
+    """
+
+    def __init__(self, max_items: int = DEFAULT_MAX_ITEMS, db_path: Optional[str] = None):
+        self.max_items = max_items
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encoded = 0
+        self.encode_seconds = 0.0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str):
+        """Open (and create if needed) the on-disk tier."""
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            dim INTEGER NOT NULL,
+            vector BLOB NOT NULL
+        )''')
+        self._conn.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up texts; returns a vector or None per text and updates hit/miss counters."""
+        keys = [cache_key(model_name, t) for t in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        with self._lock:
+            pending: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.hits += 1
+                else:
+                    pending.setdefault(key, []).append(i)
+            if pending and self._conn is not None:
+                found = self._load(list(pending))
+                for key, vector in found.items():
+                    self._remember(key, vector)
+                    for i in pending.pop(key):
+                        results[i] = vector
+                        self.hits += 1
+                        self.disk_hits += 1
+            self.misses += sum(len(idx) for idx in pending.values())
+        return results
+
+    def _load(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model_name: str, texts: List[str], vectors: np.ndarray):
+        """Store freshly encoded vectors in both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model_name, text)
+                vector = np.ascontiguousarray(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                self._remember(key, vector)
+                rows.append((key, int(vector.shape[0]), vector.tobytes()))
+            if self._conn is not None and rows:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)', rows
+                )
+                self._conn.commit()
+
+    def record_encode(self, n_texts: int, seconds: float):
+        """Account encoder work so stats() can estimate the time saved by hits."""
+        with self._lock:
+            self.encoded += n_texts
+            self.encode_seconds += seconds
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and an estimate of the encoder time saved."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            per_text = self.encode_seconds / self.encoded if self.encoded else 0.0
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'memory_items': len(self._memory),
+                'encoded_texts': self.encoded,
+                'encode_seconds': round(self.encode_seconds, 3),
+                'estimated_seconds_saved': round(self.hits * per_text, 3),
+            }
+
+    def clear(self, disk: bool = False):
+        """Drop the in-memory tier (and the on-disk tier if disk=True)."""
+        with self._lock:
+            self._memory.clear()
+            if disk and self._conn is not None:
+                self._conn.execute('DELETE FROM embeddings')
+                self._conn.commit()
+
+
+def cache_from_env() -> EmbeddingCache:
+    """Build the default cache; OPERATIONCV_EMBEDDING_CACHE_DB enables the on-disk tier."""
+    max_items = int(os.environ.get('OPERATIONCV_EMBEDDING_CACHE_SIZE', DEFAULT_MAX_ITEMS))
+    db_path = os.environ.get('OPERATIONCV_EMBEDDING_CACHE_DB') or None
+    return EmbeddingCache(max_items=max_items, db_path=db_path)
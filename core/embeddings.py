@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from core.chunking import chunk_text, pool_chunks
+from core.embedding_cache import EmbeddingCache, cache_from_env
+from core.encoders import BACKEND, load_encoder
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Word pieces the encoder reads per input when the model does not say (MiniLM's max_seq_length)
+DEFAULT_MAX_SEQ_LENGTH = 256
+# [CLS] and [SEP] count towards max_seq_length
+SPECIAL_TOKENS = 2
+CHARS_PER_TOKEN = 4
+POOLING = os.environ.get('OPERATIONCV_EMBEDDING_POOLING', 'mean')
+
+
+class EmbeddingEngine:
+    """
+    Owns one loaded sentence encoder and serializes access to it. backend picks how the model
+    runs (core.encoders.BACKENDS); int8 vectors are cached apart from full-precision ones.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, model=None, cache: Optional[EmbeddingCache] = None,
+                 backend: str = BACKEND):
+        self.model_name = model_name
+        self.backend = backend
+        self.cache_name = model_name if backend in ('torch', 'onnx') else f"{model_name}@{backend}"
+        self._model = model
+        self.cache = cache
+        self._load_lock = threading.Lock()
+        # HF fast tokenizers are not safe to call from several threads at once
+        self._encode_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Return the underlying model, loading it on first access."""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    # Loaded here so torch / onnxruntime only load when an embedding is actually needed
+                    self._model = load_encoder(self.model_name, self.backend)
+        return self._model
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode one text or a list of texts into L2-normalized float32 vectors.
+        A single string returns a 1-D vector, a list returns a 2-D matrix.
+        """
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if self.cache is None:
+            emb = self._encode_uncached(batch, batch_size)
+        else:
+            emb = self._encode_cached(batch, batch_size)
+        return emb[0] if single else emb
+
+    def _encode_uncached(self, batch: List[str], batch_size: int) -> np.ndarray:
+        model = self.model
+        start = time.perf_counter()
+        with self._encode_lock:
+            emb = model.encode(
+                batch,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        if self.cache is not None:
+            self.cache.record_encode(len(batch), time.perf_counter() - start)
+        return np.asarray(emb, dtype=np.float32)
+
+    def _encode_cached(self, batch: List[str], batch_size: int) -> np.ndarray:
+        found = self.cache.get_many(self.cache_name, batch)
+        # Encode each distinct missing text once, even if it repeats within the batch
+        missing = list(dict.fromkeys(t for t, v in zip(batch, found) if v is None))
+        if missing:
+            fresh = self._encode_uncached(missing, batch_size)
+            self.cache.put_many(self.cache_name, missing, fresh)
+            by_text = dict(zip(missing, fresh))
+            found = [v if v is not None else by_text[t] for t, v in zip(batch, found)]
+        if not found:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack(found)
+
+    @property
+    def max_tokens(self) -> int:
+        """Word pieces per chunk: the model's input limit minus its special tokens."""
+        return (getattr(self.model, 'max_seq_length', None) or DEFAULT_MAX_SEQ_LENGTH) - SPECIAL_TOKENS
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Word pieces per text with the model's tokenizer (about 4 chars per token without one)."""
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None or not texts:
+            return [(len(t) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN for t in texts]
+        with self._encode_lock:
+            ids = tokenizer(texts, add_special_tokens=False, verbose=False)['input_ids']
+        return [len(i) for i in ids]
+
+    def encode_documents(self, texts: List[str], pooling: str = POOLING, batch_size: int = 32,
+                         query: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode whole documents, however long: each text is split into chunks that fit the
+        model's input (core.chunking.chunk_text), all chunks of all texts go through one encode
+        call, and each text's chunk vectors are pooled into one normalized row (see pool_chunks;
+        query applies to 'attention' pooling). Texts that fit are encoded exactly as by encode,
+        and chunk vectors are cached like any other text.
+        """
+        chunked = [chunk_text(text, self.max_tokens, self.count_tokens) for text in texts]
+        flat = [chunk for chunks in chunked for chunk, _ in chunks]
+        if not flat:
+            return np.zeros((0, 0), dtype=np.float32)
+        emb = self.encode(flat, batch_size=batch_size)
+        rows, start = [], 0
+        for chunks in chunked:
+            stop = start + len(chunks)
+            rows.append(pool_chunks(emb[start:stop], [tokens for _, tokens in chunks], pooling, query))
+            start = stop
+        if len(flat) > len(texts):
+            logger.info(f"Encoded {len(texts)} documents as {len(flat)} chunks")
+        return np.stack(rows)
+
+    def similarity(self, a: str, b: str) -> float:
+        """Cosine similarity between two texts (-1 to 1), each read in full (see encode_documents)."""
+        emb = self.encode_documents([a, b])
+        return float(np.dot(emb[0], emb[1]))
+
+
+_engines: Dict[str, EmbeddingEngine] = {}
+_engines_lock = threading.Lock()
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache shared by all engines."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = cache_from_env()
+    return _cache
+
+
+def get_engine(model_name: str = MODEL_NAME) -> EmbeddingEngine:
+    """Return the process-wide engine for model_name, creating it once."""
+    engine = _engines.get(model_name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(model_name)
+            if engine is None:
+                engine = EmbeddingEngine(model_name, cache=get_cache())
+                _engines[model_name] = engine
+    return engine
+
+
+def resolve_engine(model=None, model_name: str = MODEL_NAME) -> EmbeddingEngine:
+    """
+    Normalize the `model` argument accepted by scoring functions.
+    Accepts an EmbeddingEngine, a raw SentenceTransformer or None (shared engine).
+    """
+    if model is None:
+        return get_engine(model_name)
+    if isinstance(model, EmbeddingEngine):
+        return model
+    # A raw model passed in is a SentenceTransformer, whatever OPERATIONCV_EMBEDDING_BACKEND says
+    return EmbeddingEngine(model_name, model=model, cache=get_cache(), backend='torch')
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+BACKEND = os.environ.get('OPERATIONCV_EMBEDDING_BACKEND', 'torch')
+# Intra-op threads for inference (torch.set_num_threads / onnxruntime); unset leaves the library default
+THREADS = int(os.environ.get('OPERATIONCV_EMBEDDING_THREADS', 0)) or None
+ONNX_DIR = os.environ.get('OPERATIONCV_ONNX_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'operationcv', 'onnx'))
+ONNX_OPSET = 14
+# Largest accepted 1 - cosine(vector, torch vector) for the same text, checked by
+# benchmarks/encoder_backends.py: fp32 ONNX differs from torch only by float rounding,
+# int8 by the error of quantizing the weights.
+TOLERANCE = {'torch': 0.0, 'onnx': 1e-5, 'onnx-int8': 2e-2}
+
+
+def _export_dir(model_name: str, directory: str) -> str:
+    return os.path.join(directory, re.sub(r'[^A-Za-z0-9._-]+', '_', model_name.strip('/')))
+
+
+def export_onnx(model_name: str, directory: str = ONNX_DIR, quantize: bool = False) -> str:
+    """
+    Export a mean-pooling sentence-transformers model to ONNX (once per directory) and return
+    the model file path; with quantize, also write and return a dynamically int8-quantized copy.
+    The tokenizer and a small config are saved next to it, so inference needs neither torch
+    nor transformers.
+    """
+    target = _export_dir(model_name, directory)
+    fp32_path = os.path.join(target, 'model.onnx')
+    if not os.path.exists(fp32_path):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        st = SentenceTransformer(model_name, device='cpu')
+        # Module classes moved between sentence-transformers releases; match them by name
+        modules = {type(m).__name__: m for m in st}
+        pooling = modules['Pooling'].get_config_dict() if 'Pooling' in modules else {}
+        if not (pooling.get('pooling_mode') == 'mean' or pooling.get('pooling_mode_mean_tokens')):
+            raise ValueError(f"Only mean-pooling models can run on ONNX: {model_name}")
+        transformer = st[0].auto_model.eval()
+
+        class HiddenStates(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, input_ids, attention_mask, token_type_ids=None):
+                return self.transformer(input_ids=input_ids, attention_mask=attention_mask,
+                                        token_type_ids=token_type_ids).last_hidden_state
+
+        sample = st.tokenizer(['An example sentence to trace the graph.'], return_tensors='pt')
+        names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in sample]
+        axes = {name: {0: 'batch', 1: 'sequence'} for name in names + ['last_hidden_state']}
+        os.makedirs(target, exist_ok=True)
+        # Several processes may export at once (e.g. batch workers on first use): each writes
+        # into its own staging directory and moves finished files in, model.onnx last
+        staging = tempfile.mkdtemp(dir=target, prefix='.export-')
+        try:
+            with torch.no_grad():
+                torch.onnx.export(HiddenStates(), tuple(sample[n] for n in names), os.path.join(staging, 'model.onnx'),
+                                  input_names=names, output_names=['last_hidden_state'], dynamic_axes=axes,
+                                  opset_version=ONNX_OPSET, dynamo=False)
+            st.tokenizer.save_pretrained(staging)
+            with open(os.path.join(staging, 'encoder.json'), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'model_name': model_name,
+                    'max_seq_length': st.max_seq_length,
+                    'pad_token': st.tokenizer.pad_token,
+                }, f, indent=2)
+            files = sorted(os.listdir(staging), key=lambda name: name == 'model.onnx')
+            for name in files:
+                os.replace(os.path.join(staging, name), os.path.join(target, name))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        logger.info(f"Exported {model_name} to {fp32_path}")
+    if not quantize:
+        return fp32_path
+    int8_path = os.path.join(target, 'model-int8.onnx')
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        # quantize_dynamic also writes a shape-inferred copy next to its input, so each process
+        # quantizes a link to the model inside its own staging directory
+        staging = tempfile.mkdtemp(dir=target, prefix='.quantize-')
+        try:
+            source = os.path.join(staging, 'model.onnx')
+            try:
+                os.link(fp32_path, source)
+            except OSError:
+                shutil.copyfile(fp32_path, source)
+            quantize_dynamic(source, os.path.join(staging, 'model-int8.onnx'), weight_type=QuantType.QInt8)
+            os.replace(os.path.join(staging, 'model-int8.onnx'), int8_path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        logger.info(f"Quantized {model_name} to {int8_path}")
+    return int8_path
+
+
+class TokenizerAdapter:
+    """
+    The slice of the transformers tokenizer call interface that token counting uses
+    (core.embeddings, core.prompt_budget), over a plain `tokenizers.Tokenizer`.
+    """
+
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def encode(self, text: str, add_special_tokens: bool = True) -> List[int]:
+        return self._tokenizer.encode(text, add_special_tokens=add_special_tokens).ids
+
+    def __call__(self, texts: Union[str, List[str]], add_special_tokens: bool = True, **kwargs) -> Dict[str, List]:
+        if isinstance(texts, str):
+            return {'input_ids': self.encode(texts, add_special_tokens)}
+        encodings = self._tokenizer.encode_batch(list(texts), add_special_tokens=add_special_tokens)
+        return {'input_ids': [e.ids for e in encodings]}
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder running an exported transformer with onnxruntime on CPU. Offers the parts
+    of the SentenceTransformer interface EmbeddingEngine uses: encode(), tokenizer and
+    max_seq_length. Embeddings are the attention-masked mean of the last hidden states.
+    """
+
+    def __init__(self, model_path: str, tokenizer_path: str, max_seq_length: int, pad_token: str = '[PAD]',
+                 threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.max_seq_length = max_seq_length
+        # One copy pads and truncates model inputs; the other counts tokens untouched
+        self._batch_tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._batch_tokenizer.enable_truncation(max_seq_length)
+        pad_id = self._batch_tokenizer.token_to_id(pad_token) or 0
+        self._batch_tokenizer.enable_padding(pad_id=pad_id, pad_token=pad_token)
+        counting = Tokenizer.from_file(tokenizer_path)
+        counting.no_truncation()
+        counting.no_padding()
+        self.tokenizer = TokenizerAdapter(counting)
+
+    @classmethod
+    def load(cls, model_name: str, quantize: bool = False, threads: Optional[int] = None,
+             directory: str = ONNX_DIR) -> 'OnnxEncoder':
+        """Load the exported model, exporting (and quantizing) it first if needed."""
+        model_path = export_onnx(model_name, directory, quantize)
+        target = os.path.dirname(model_path)
+        with open(os.path.join(target, 'encoder.json'), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        logger.info(f"Loading ONNX embedding model: {model_path}")
+        return cls(model_path, os.path.join(target, 'tokenizer.json'), config['max_seq_length'],
+                   config.get('pad_token') or '[PAD]', threads)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.zeros((len(texts), 0), dtype=np.float32)
+        # Similar lengths together, so each batch pads as little as possible
+        order = np.argsort([-len(t) for t in texts], kind='stable')
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            encodings = self._batch_tokenizer.encode_batch([texts[i] for i in idx])
+            feed = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {n: feed[n] for n in self.input_names})[0]
+            mask = feed['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if not out.shape[1]:
+                out = np.zeros((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[idx] = pooled
+        if normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+
+def load_encoder(model_name: str, backend: str = BACKEND, threads: Optional[int] = THREADS):
+    """A sentence encoder for model_name on the given backend (see BACKENDS)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    if backend == 'torch':
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        logger.info(f"Loading embedding model: {model_name}")
+        return SentenceTransformer(model_name)
+    return OnnxEncoder.load(model_name, quantize=backend == 'onnx-int8', threads=threads)
@@ -0,0 +1,166 @@
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from core.file_utils import atomic_write
+from core.save_utils import DEFAULT_SECTION_TITLES, build_docx, build_pdf_bytes, split_sections
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'template')
+REQUIRED_VARIABLES = ('summary', 'experience', 'education', 'skills')
+# Section variables documented in template/example_template.md; 'content' holds the whole CV
+SECTION_VARIABLES = REQUIRED_VARIABLES + ('projects', 'languages', 'publications', 'interests', 'awards',
+                                          'activities', 'volunteering', 'extracurricular', 'certifications')
+# Below this many documents, starting worker processes costs more than it saves
+PARALLEL_EXPORT_THRESHOLD = 8
+EXPORT_FORMATS = ('.docx', '.pdf')
+
+
+class CompiledTemplate(NamedTuple):
+    path: str
+    mtime_ns: int
+    data: bytes
+    variables: FrozenSet[str]
+
+    def render(self, context: Dict[str, str]) -> bytes:
+        """Render into DOCX bytes from the cached template bytes (no disk read, no re-validation)."""
+        from docxtpl import DocxTemplate
+        doc = DocxTemplate(io.BytesIO(self.data))
+        doc.render(context)
+        out = io.BytesIO()
+        doc.save(out)
+        return out.getvalue()
+
+
+def compile_template(source, path: str = '<memory>', mtime_ns: int = 0) -> CompiledTemplate:
+    """
+    Parse a DOCX template once and check it declares at least one CV section variable.
+    Raises ValueError for templates without any.
+    """
+    from docxtpl import DocxTemplate
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+    elif hasattr(source, 'read'):
+        source.seek(0)
+        data = source.read()
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    variables = frozenset(DocxTemplate(io.BytesIO(data)).get_undeclared_template_variables())
+    found = variables.intersection(REQUIRED_VARIABLES)
+    if not found:
+        raise ValueError("Template must contain at least one CV section variable")
+    missing = set(REQUIRED_VARIABLES) - found
+    if missing:
+        logger.warning(f"Template missing recommended variables: {', '.join(sorted(missing))}")
+    return CompiledTemplate(path, mtime_ns, data, variables)
+
+
+class TemplateCache:
+    """Compiled templates keyed by path; an entry is recompiled only when the file's mtime or size changes."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Tuple[int, int], CompiledTemplate]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> CompiledTemplate:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        compiled = compile_template(path, path, stat.st_mtime_ns)
+        with self._lock:
+            self._entries[path] = (stamp, compiled)
+        logger.info(f"Compiled template {path} ({len(compiled.variables)} variables)")
+        return compiled
+
+    def preload(self, directory: str = TEMPLATE_DIR) -> List[str]:
+        """Compile every valid .docx template in directory; returns their paths."""
+        loaded = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.docx') and not name.startswith('~$'):
+                try:
+                    loaded.append(self.get(os.path.join(directory, name)).path)
+                except Exception as e:
+                    logger.warning(f"Skipping template {name}: {e}")
+        return loaded
+
+
+_template_cache = TemplateCache()
+
+
+def get_template_cache() -> TemplateCache:
+    """Per-process template cache (each export worker process fills its own)."""
+    return _template_cache
+
+
+def build_context(cv_text: str) -> Dict[str, str]:
+    """Template variables for a CV: one per detected section, plus 'content' with the full text."""
+    context = {name: '' for name in SECTION_VARIABLES}
+    titles = tuple(dict.fromkeys(DEFAULT_SECTION_TITLES + SECTION_VARIABLES))
+    for title, text in split_sections(cv_text, titles):
+        key = title.lower()
+        if key in context:
+            context[key] = f"{context[key]}\n\n{text}" if context[key] else text
+    context['content'] = cv_text.strip()
+    return context
+
+
+def render_cv(cv_text: str, fmt: str, template: Optional[str] = None) -> bytes:
+    """DOCX (from template when given, else a plain document) or PDF bytes for one CV."""
+    fmt = fmt if fmt.startswith('.') else f'.{fmt}'
+    if fmt == '.pdf':
+        return build_pdf_bytes(cv_text)
+    if fmt != '.docx':
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if template:
+        return get_template_cache().get(template).render(build_context(cv_text))
+    buffer = io.BytesIO()
+    build_docx(cv_text).save(buffer)
+    return buffer.getvalue()
+
+
+def export_cv(cv_text: str, output_path: str, template: Optional[str] = None) -> str:
+    """Render one CV in the format given by output_path's extension and write it atomically."""
+    return atomic_write(output_path, render_cv(cv_text, os.path.splitext(output_path)[1].lower(), template))
+
+
+def _export_job(job: Tuple[str, str, Optional[str]]) -> Tuple[str, Optional[str]]:
+    cv_text, output_path, template = job
+    try:
+        export_cv(cv_text, output_path, template)
+        return output_path, None
+    except Exception as e:
+        logger.error(f"Export failed for {output_path}: {e}")
+        return output_path, str(e)
+
+
+def export_many(jobs: Iterable[Tuple[str, str]], template: Optional[str] = None,
+                workers: Optional[int] = None) -> List[Dict]:
+    """
+    Export (cv_text, output_path) pairs, in a process pool when there are enough of them.
+    The template is validated once here; each worker then compiles it once and reuses it.
+    Returns [{'path', 'error'}] in input order; one failure does not stop the others.
+    """
+    jobs = [(cv_text, path, template) for cv_text, path in jobs]
+    if not jobs:
+        return []
+    if template:
+        get_template_cache().get(template)
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) < PARALLEL_EXPORT_THRESHOLD:
+        results = [_export_job(job) for job in jobs]
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_export_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    logger.info(f"Exported {len(jobs)} documents in {time.perf_counter() - start:.2f}s")
+    return [{'path': path, 'error': error} for path, error in results]
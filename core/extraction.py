@@ -0,0 +1,182 @@
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Part of the parsed-document cache key (core.document_cache): bump whenever a change here
+# alters the text extracted from the same file
+EXTRACTION_VERSION = 1
+# Below this many pages, process start-up costs more than it saves
+PARALLEL_PAGE_THRESHOLD = 16
+PAGES_PER_TASK = 4
+
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+Source = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable file object over a bytes-like buffer that never copies the whole buffer."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("Negative seek position")
+        self._pos = pos
+        return pos
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def readall(self):
+        data = self._view[self._pos:].tobytes()
+        self._pos = len(self._view)
+        return data
+
+
+def is_path(source) -> bool:
+    """True for filesystem paths, False for in-memory sources."""
+    return isinstance(source, (str, os.PathLike))
+
+
+def open_source(source: Source):
+    """
+    Return something pdfplumber/python-docx can open: the path itself, or a seekable file object.
+    Bytes-like sources and BytesIO-style uploads (e.g. Streamlit's UploadedFile) are wrapped
+    around their existing buffer instead of being copied or written to disk.
+    """
+    if is_path(source):
+        return source
+    if isinstance(source, BUFFER_TYPES):
+        return BufferReader(source)
+    if hasattr(source, 'getbuffer'):
+        return BufferReader(source.getbuffer())
+    if hasattr(source, 'read'):
+        source.seek(0)
+        return source
+    raise TypeError(f"Unsupported document source: {type(source).__name__}")
+
+
+def source_extension(source: Source, ext: Optional[str] = None) -> str:
+    """File extension (with dot, lower case) from an explicit ext, a path, or a file object's name."""
+    if ext:
+        ext = ext.lower()
+        return ext if ext.startswith('.') else f".{ext}"
+    name = os.fspath(source) if is_path(source) else getattr(source, 'name', None)
+    if not name:
+        raise ValueError("File type must be given for in-memory documents")
+    return os.path.splitext(name)[1].lower()
+
+
+def _page_text(page) -> Optional[str]:
+    """Extract one page's text exactly once and release pdfplumber's per-page cache."""
+    text = page.extract_text()
+    page.close()
+    return text
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Worker: extract pages [start, stop) of a PDF, skipping empty pages."""
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        texts = []
+        for page in pdf.pages[start:stop]:
+            text = _page_text(page)
+            if text:
+                texts.append(text)
+        return texts
+
+
+def iter_pdf_pages(source: Source, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of each non-empty PDF page, in page order, as soon as it is available.
+    Large PDFs on disk are split into page ranges and extracted in a process pool; workers=1
+    forces serial. In-memory PDFs are always extracted serially to avoid copying them to workers.
+    """
+    import pdfplumber
+    with pdfplumber.open(open_source(source)) as pdf:
+        n_pages = len(pdf.pages)
+        if workers == 1 or n_pages < PARALLEL_PAGE_THRESHOLD or not is_path(source):
+            for page in pdf.pages:
+                text = _page_text(page)
+                if text:
+                    yield text
+            return
+
+    ranges = [(start, min(start + PAGES_PER_TASK, n_pages)) for start in range(0, n_pages, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_page_range, source, start, stop) for start, stop in ranges]
+        # Consume in order so callers see pages sequentially while later ranges are still running
+        for future in futures:
+            yield from future.result()
+
+
+def extract_text_from_pdf(source: Source, workers: Optional[int] = None):
+    """Extract text from a PDF file using pdfplumber."""
+    return "\n".join(iter_pdf_pages(source, workers))
+
+
+def extract_text_from_docx(source: Source):
+    """Extract text from a DOCX file using python-docx."""
+    import docx
+    doc = docx.Document(open_source(source))
+    return "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+
+
+def extract_text_from_txt(source: Source):
+    """Extract text from a TXT file."""
+    if is_path(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            return f.read()
+    return open_source(source).read().decode('utf-8')
+
+
+def extract_text(source: Source, ext: Optional[str] = None):
+    """
+    Detect file type and extract text.
+    source may be a path, bytes/bytearray/memoryview, or a binary file object; for
+    in-memory sources without a .name, pass ext (e.g. '.pdf').
+    """
+    ext = source_extension(source, ext)
+    if ext == '.pdf':
+        return extract_text_from_pdf(source)
+    elif ext == '.docx':
+        return extract_text_from_docx(source)
+    elif ext == '.txt':
+        return extract_text_from_txt(source)
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+
+
+def iter_text_lines(source: Source, ext: Optional[str] = None) -> Iterator[str]:
+    """Yield document lines incrementally; PDFs stream page by page."""
+    if source_extension(source, ext) == '.pdf':
+        for page_text in iter_pdf_pages(source):
+            yield from page_text.splitlines()
+    else:
+        yield from extract_text(source, ext).splitlines()
@@ -1,15 +1,34 @@
 import os
-import shutil
 from datetime import datetime
 import tempfile
-from pathlib import Path
 import logging
-from docxtpl import DocxTemplate  # For template validation
+
+from core.extraction import open_source
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def atomic_write(path, data):
+    """
+    Write bytes to path so readers only ever see the old or the complete new file:
+    write a temp file in the same directory, fsync, then rename over the target.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
 class FileManager:
     def __init__(self, base_dir=None):
         """Initialize FileManager with a base directory for operations"""
@@ -113,23 +132,14 @@ class FileManager:
         return os.path.join(self.template_dir, 'cv_template.docx')
 
     def validate_template(self, template_path):
-        """Validate that a template file has the correct structure"""
+        """Validate that a template file (path or file object) has the correct structure"""
         try:
-            doc = DocxTemplate(template_path)
-            content = doc.get_docx().element.body.xml
-            required_vars = ['summary', 'experience', 'education', 'skills']
-            found_vars = []
-            for var in required_vars:
-                if f'{{{{ {var} }}}}' in content:
-                    found_vars.append(var)
-            
-            if not found_vars:
-                raise ValueError("Template must contain at least one CV section variable")
-                
-            missing = set(required_vars) - set(found_vars)
-            if missing:
-                logger.warning(f"Template missing recommended variables: {', '.join(missing)}")
-            
+            from core.export import compile_template, get_template_cache
+            # Paths are compiled once per mtime and reused by exports; uploads are checked in memory
+            if isinstance(template_path, (str, os.PathLike)):
+                get_template_cache().get(template_path)
+            else:
+                compile_template(template_path)
             return True
         except Exception as e:
             logger.error(f"Template validation failed: {e}")
@@ -138,13 +148,11 @@ class FileManager:
     def save_template(self, uploaded_file):
         """Save an uploaded template file after validation"""
         try:
-            temp_path = self.save_uploaded_file(uploaded_file, 'temp', prefix='template_')
-            if not self.validate_template(temp_path):
-                os.remove(temp_path)
+            # Validate straight from the upload buffer before anything touches disk
+            if not self.validate_template(open_source(uploaded_file)):
                 raise ValueError("Invalid template structure")
-                
-            template_path = os.path.join(self.template_dir, uploaded_file.name)
-            shutil.move(temp_path, template_path)
+
+            template_path = self.save_uploaded_file(uploaded_file, 'templates')
             logger.info(f"Template saved successfully: {template_path}")
             return template_path
         except Exception as e:
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# CVs scored per sparse-dense product in LexicalIndex.scores
+SCORE_BATCH_SIZE = 256
+# Reference corpus statistics (see LexicalIndex.save), next to the applications database by default
+LEXICAL_INDEX_PATH = os.environ.get('OPERATIONCV_LEXICAL_INDEX',
+                                    str(Path(__file__).parent.parent / 'lexical_index.npz'))
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does
+during each either etc for from had has have having he her here his how i if in into is it its
+itself may me more most must my no nor not of on once only or other our ours out over own per
+same shall she should so some such than that the their them then there these they this those
+through to too under until up upon us very was we were what when where which while who whom why
+will with within without would you your yours
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens ('c++' and 'c#' kept whole), without stopwords and single characters."""
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    BM25 document frequencies over a reference corpus of job descriptions. The corpus changes
+    only through add() (see update_lexical_index), never as a side effect of scoring, so a CV/JD
+    pair gets the same score however many other JDs were scored before it. Scored JDs are
+    weighted with the reference IDF; terms the reference has never seen count as rare.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self._df = np.zeros(0, dtype=np.int64)
+        self._total_length = 0
+        self._hashes = set()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _term_matrix(self, token_lists: Sequence[Sequence[str]], extra: Dict[str, int], grow: bool):
+        """
+        CSR term counts, one row per token list. Terms outside the vocabulary take ids after it,
+        kept in extra: added there when grow is set, dropped otherwise.
+        """
+        from scipy import sparse
+        vocabulary, size = self.vocabulary, len(self.vocabulary)
+        indptr, columns, counts = [0], [], []
+        for tokens in token_lists:
+            ids = []
+            for token in tokens:
+                i = vocabulary.get(token)
+                if i is None:
+                    i = extra.setdefault(token, size + len(extra)) if grow else extra.get(token)
+                if i is not None:
+                    ids.append(i)
+            unique, count = np.unique(np.asarray(ids, dtype=np.int64), return_counts=True)
+            columns.append(unique)
+            counts.append(count)
+            indptr.append(indptr[-1] + len(unique))
+        return sparse.csr_matrix(
+            (np.concatenate(counts).astype(np.float32) if counts else np.zeros(0, dtype=np.float32),
+             np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64), indptr),
+            shape=(len(token_lists), size + len(extra)),
+        )
+
+    def add(self, texts: Sequence[str]) -> int:
+        """
+        Add JDs to the reference corpus and return how many were new; a text already in it
+        does not count twice towards document frequencies.
+        """
+        added = []
+        with self._lock:
+            for text in texts:
+                key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+                if key not in self._hashes:
+                    self._hashes.add(key)
+                    tokens = tokenize(text)
+                    self._total_length += len(tokens)
+                    added.append(np.unique([self.vocabulary.setdefault(t, len(self.vocabulary)) for t in tokens]))
+            if added:
+                df = np.zeros(len(self.vocabulary), dtype=np.int64)
+                df[:len(self._df)] = self._df
+                df += np.bincount(np.concatenate(added).astype(np.int64), minlength=len(df))
+                self._df = df
+        return len(added)
+
+    def idf(self, df: Optional[np.ndarray] = None) -> np.ndarray:
+        """BM25 inverse document frequency per term of df (default: the vocabulary); always positive."""
+        df = self._df if df is None else df
+        return np.log1p((len(self) - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    def scores(self, cv_texts: Sequence[str], jd_texts: Sequence[str]) -> np.ndarray:
+        """
+        Lexical overlap of each CV with each JD, as an (n_cvs, n_jds) array in [0, 1]: the share
+        of the JD's BM25 term weight (reference IDF times saturated, length-normalized term
+        frequency) carried by terms that also appear in the CV. Each JD is weighted on its own,
+        so its scores do not depend on the other JDs passed in.
+        """
+        from scipy import sparse
+        with self._lock:
+            extra = {}
+            counts = self._term_matrix([tokenize(text) for text in jd_texts], extra, grow=True)
+            presence = self._term_matrix([tokenize(text) for text in cv_texts], extra, grow=False)
+            df = np.zeros(counts.shape[1], dtype=np.int64)
+            df[:len(self._df)] = self._df
+            idf = self.idf(df)
+            average = self._total_length / len(self) if len(self) else None
+        lengths = np.asarray(counts.sum(axis=1), dtype=np.float32).ravel()
+        # Without a reference corpus each JD is its own average, i.e. no length normalization
+        relative = lengths / max(average, 1.0) if average is not None else np.ones_like(lengths)
+        scale = self.k1 * (1 - self.b + self.b * relative)
+        tf = counts.data
+        row_scale = np.repeat(scale, np.diff(counts.indptr))
+        weights = sparse.csr_matrix(
+            ((tf * (self.k1 + 1) / (tf + row_scale)) * idf[counts.indices], counts.indices, counts.indptr),
+            shape=counts.shape,
+        )
+        norms = np.asarray(weights.sum(axis=1)).ravel()
+        presence.data[:] = 1
+        out = np.zeros((len(cv_texts), len(jd_texts)), dtype=np.float32)
+        # Dense presence columns, a bounded number of CVs at a time
+        for start in range(0, len(cv_texts), SCORE_BATCH_SIZE):
+            dense = presence[start:start + SCORE_BATCH_SIZE].T.toarray()
+            out[start:start + len(dense.T)] = (weights @ dense).T
+        return np.divide(out, norms, out=out, where=norms > 0)
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        """Write the corpus statistics atomically (numpy .npz)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, terms=np.array(list(self.vocabulary), dtype=str), df=self._df,
+                             hashes=np.array(sorted(self._hashes), dtype=str),
+                             total_length=np.int64(self._total_length))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> 'LexicalIndex':
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            index.vocabulary = {str(term): i for i, term in enumerate(data['terms'])}
+            index._df = data['df'].astype(np.int64)
+            index._hashes = {str(h) for h in data['hashes']}
+            index._total_length = int(data['total_length'])
+        return index
+
+
+_index: Optional[LexicalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    Process-wide reference index, loaded from OPERATIONCV_LEXICAL_INDEX when that file exists.
+    Empty otherwise: every term then has the same IDF.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LexicalIndex.load(LEXICAL_INDEX_PATH) if os.path.exists(LEXICAL_INDEX_PATH) else LexicalIndex()
+    return _index
+
+
+def update_lexical_index(repository=None, path: str = LEXICAL_INDEX_PATH, batch_size: int = 500) -> int:
+    """
+    Add the JDs of every saved application (default repository unless given) to the reference
+    index and save it; returns how many JDs were new. Keyword scores change only after this.
+    """
+    from core.applications import get_repository
+    repository = repository or get_repository()
+    index = get_lexical_index()
+    added, cursor = 0, None
+    while True:
+        page = repository.list(limit=batch_size, after=cursor, columns=('jd_text',))
+        added += index.add([item['jd_text'] for item in page['items'] if item['jd_text']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    index.save(path)
+    return added
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = str(Path(__file__).parent.parent / '.cache' / 'llm_responses.db')
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Payload fields that determine the generated text. max_tokens is left out: it follows the prompt
+# budget, which shifts with how tokens are counted (core.prompt_budget.TokenCounter), and it only
+# matters to answers it cut off, which are never stored (see put)
+KEY_FIELDS = ('messages', 'model', 'temperature', 'top_p')
+
+
+def response_key(payload: Dict) -> str:
+    """sha256 over the messages, model id and sampling parameters of a chat payload."""
+    material = {field: payload.get(field) for field in KEY_FIELDS}
+    blob = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent SQLite cache of raw completion text, with TTL and total-size eviction.
+    Tracks hits, misses and the generation time that hits avoided.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            generation_seconds REAL NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)')
+        self._conn.commit()
+
+    def get(self, payload: Dict) -> Optional[str]:
+        """Cached completion text for this payload, or None if absent or expired."""
+        key = response_key(payload)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT content, generation_seconds, created_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_seconds += row[1]
+            return row[0]
+
+    def put(self, payload: Dict, content: str, generation_seconds: float, finish_reason: Optional[str] = None):
+        """
+        Store a completion and evict expired, then least recently used, entries. Answers cut off
+        by max_tokens (finish_reason 'length') are not stored.
+        """
+        if finish_reason == 'length':
+            return
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, content, generation_seconds, size, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (response_key(payload), content, generation_seconds, size, now, now),
+            )
+            self._conn.execute('DELETE FROM responses WHERE created_at < ?', (now - self.ttl_seconds,))
+            self._evict_to_size()
+            self._conn.commit()
+
+    def _evict_to_size(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess, victims = total - self.max_bytes, []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY last_used').fetchall():
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', victims)
+
+    def stats(self) -> Dict:
+        """Hit rate and generation seconds saved by cache hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'saved_generation_seconds': round(self.saved_seconds, 1),
+                'entries': entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """
+    Process-wide response cache. OPERATIONCV_LLM_CACHE_DB overrides the location;
+    set it to an empty string to disable caching.
+    """
+    global _cache
+    db_path = os.environ.get('OPERATIONCV_LLM_CACHE_DB', DEFAULT_DB_PATH)
+    if not db_path:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(
+                    db_path,
+                    ttl_seconds=float(os.environ.get('OPERATIONCV_LLM_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+                )
+    return _cache
@@ -2,14 +2,19 @@ import logging
 import json
 import requests
 import os
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
-from jsonschema import validate
+
+from core.llm_cache import get_response_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load CV schema
+@lru_cache(maxsize=1)
 def load_cv_schema():
     """Load the CV JSON schema from file"""
     schema_path = Path(__file__).parent / 'cv_schema.json'
@@ -18,50 +23,125 @@ def load_cv_schema():
     with open(schema_path) as f:
         return json.load(f)
 
-CV_SCHEMA = load_cv_schema()
+def __getattr__(name):
+    # CV_SCHEMA is read from disk on first access rather than at import time
+    if name == 'CV_SCHEMA':
+        return load_cv_schema()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def ask_local_llm(prompt, system_prompt=None, temperature=0.7):
-    """
-    Send a prompt to the local LLM and return the response
-    """
-    url = "http://localhost:1234/v1/chat/completions"
-    messages = []
-    
-    # Add system message if provided
-    if system_prompt:
-        messages.append({"role": "system", "content": system_prompt})
-    else:
-        # Default system prompt with clear output format instructions
-        messages.append({"role": "system", "content": """You are a CV analysis assistant.
+LLM_URL = "http://localhost:1234/v1/chat/completions"
+# (connect, read) seconds; local generation of 2048 tokens can take minutes on small machines
+DEFAULT_TIMEOUT = (5, 300)
+# Context window loaded in LM Studio; prompts are budgeted against it (see core.prompt_budget)
+N_CTX = int(os.environ.get('OPERATIONCV_LLM_N_CTX', 2048))
+# Smallest answer length requested when a prompt leaves less room than this in N_CTX
+MIN_RESPONSE_TOKENS = 256
+
+_thread_local = threading.local()
+
+def last_call_stats():
+    """Timing of the calling thread's most recent ask_local_llm call (prefill, total, prompt tokens)"""
+    return getattr(_thread_local, 'call_stats', None)
+
+def get_session():
+    """Per-thread requests.Session so repeated calls reuse a keep-alive connection"""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({"Content-Type": "application/json"})
+        _thread_local.session = session
+    return session
+
+# Default system prompt with clear output format instructions
+DEFAULT_SYSTEM_PROMPT = """You are a CV analysis assistant.
             Provide your response in this format:
             {
               "sections": {
                 "name of the section": "Your improved CV text here"
               }
             }
-            Keep the original professional level and roles."""})
-    
-    # Add user message
-    messages.append({"role": "user", "content": prompt})
-    
+            Keep the original professional level and roles."""
+
+def build_messages(prompt, system_prompt=None):
+    """Build the chat messages for a prompt, falling back to the default system prompt"""
+    return [
+        {"role": "system", "content": system_prompt or DEFAULT_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+def response_tokens(messages):
+    """Answer length that fits N_CTX after messages (at least MIN_RESPONSE_TOKENS)"""
+    from core.prompt_budget import get_token_counter
+    return max(MIN_RESPONSE_TOKENS, N_CTX - get_token_counter().count_messages(messages))
+
+def build_payload(messages, temperature=0.7, stream=False, max_tokens=None):
+    """
+    Request payload for LM Studio's OpenAI-compatible chat endpoint.
+    max_tokens should be the answer budget the prompt was sized for (see core.prompt_budget);
+    by default it is whatever room the context window leaves after the messages.
+    """
     # Configure the request payload with optimized settings for Apple Silicon
     payload = {
         "model": "local-model",
         "messages": messages,
         "temperature": temperature,
-        "max_tokens": 2048,  # Reduced for faster responses
+        "max_tokens": max_tokens or response_tokens(messages),
         "top_p": 0.1,
         "frequency_penalty": 0.0,
         "presence_penalty": 0.0,
-        "stream": False,
-        "n_ctx": 2048,      # Reduced context window
+        "stream": stream,
+        "cache_prompt": True,  # Let llama.cpp-based servers reuse the KV cache of a shared prefix
+        "n_ctx": N_CTX,     # Reduced context window
         "num_threads": 8    # Optimized for M-series chips
     }
+    if stream:
+        # Ask for a final usage chunk so token rates use the server's own count
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+def parse_llm_content(content):
+    """Turn raw completion text into a {'sections': ...} dict or cleaned plain text"""
+    # Reasoning models prefix the answer with a <think> block
+    if '</think>' in content:
+        content = content.split('</think>')[-1].strip()
+    # Try to parse as JSON first
+    try:
+        data = json.loads(content)
+        # Return the parsed JSON object if it has the correct structure
+        if isinstance(data, dict) and 'sections' in data:
+            logger.info(f"Successfully parsed JSON with sections: {list(data['sections'].keys())}")
+            return data
+    except json.JSONDecodeError as e:
+        logger.warning(f"JSON parsing failed: {e}")
+        
+    # If JSON parsing failed, try to clean up the response
+    return validate_llm_response(content)
+
+def ask_local_llm(prompt, system_prompt=None, temperature=0.7, timeout=DEFAULT_TIMEOUT, session=None,
+                  use_cache=True, refresh=False, max_tokens=None):
+    """
+    Send a prompt to the local LLM and return the response
+    Identical requests are answered from the response cache (core.llm_cache) unless
+    use_cache=False; refresh=True skips the lookup but stores the regenerated answer.
+    max_tokens caps the answer (default: the room left in the context window).
+    Prefill time and cached prompt tokens of the call are available from last_call_stats().
+    """
+    messages = build_messages(prompt, system_prompt)
+    payload = build_payload(messages, temperature, max_tokens=max_tokens)
+    cache = get_response_cache() if use_cache else None
+    if cache is not None and not refresh:
+        cached = cache.get(payload)
+        if cached is not None:
+            logger.info("LLM response served from cache")
+            _thread_local.call_stats = {'prefill_seconds': 0.0, 'total_seconds': 0.0, 'prompt_tokens': None,
+                                        'cached_prompt_tokens': None, 'cached': True}
+            return parse_llm_content(cached), None
     
     try:
-        # Send request to LM Studio
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(url, json=payload, headers=headers)
+        # Send request to LM Studio over a persistent connection
+        session = session or get_session()
+        start = time.perf_counter()
+        response = session.post(LLM_URL, json=payload, timeout=timeout)
         
         if response.status_code != 200:
             logger.error(f"LM Studio API Error: Status {response.status_code}")
@@ -69,22 +149,17 @@ def ask_local_llm(prompt, system_prompt=None, temperature=0.7):
             response.raise_for_status()
         
         # Extract content from response
-        content = response.json()['choices'][0]['message']['content']
+        body = response.json()
+        elapsed = time.perf_counter() - start
+        content = body['choices'][0]['message']['content']
         logger.info(f"Raw LLM response: {content}")
+        from core.llm_stream import prompt_stats
+        _thread_local.call_stats = {**prompt_stats(body), 'total_seconds': round(elapsed, 3), 'cached': False}
+        logger.info(f"LLM call stats: {_thread_local.call_stats}")
+        if cache is not None:
+            cache.put(payload, content, elapsed, body['choices'][0].get('finish_reason'))
         
-        # Try to parse as JSON first
-        try:
-            data = json.loads(content)
-            # Return the parsed JSON object if it has the correct structure
-            if isinstance(data, dict) and 'sections' in data:
-                logger.info(f"Successfully parsed JSON with sections: {list(data['sections'].keys())}")
-                return data, None
-        except json.JSONDecodeError as e:
-            logger.warning(f"JSON parsing failed: {e}")
-            
-        # If JSON parsing failed, try to clean up the response
-        cleaned_content = validate_llm_response(content)
-        return cleaned_content, None
+        return parse_llm_content(content), None
             
     except requests.exceptions.RequestException as e:
         logger.error(f"Request failed: {e}")
@@ -93,6 +168,87 @@ def ask_local_llm(prompt, system_prompt=None, temperature=0.7):
         logger.error(f"Error processing response: {e}")
         raise
 
+def stream_local_llm(prompt, system_prompt=None, temperature=0.7, timeout=DEFAULT_TIMEOUT,
+                     use_cache=True, refresh=False, max_tokens=None):
+    """
+    Streaming variant of ask_local_llm.
+    Returns an LLMStream: iterate it for visible text deltas (<think> blocks removed),
+    read .sections for the partially parsed {"sections": ...} object, .stats for timing,
+    and call .result() afterwards for the same value ask_local_llm returns.
+    Shares the response cache with ask_local_llm; a hit replays the cached text at once.
+    """
+    from core.llm_stream import LLMStream
+    messages = build_messages(prompt, system_prompt)
+    payload = build_payload(messages, temperature, stream=True, max_tokens=max_tokens)
+    cache = get_response_cache() if use_cache else None
+    cached = cache.get(payload) if cache is not None and not refresh else None
+    return LLMStream(LLM_URL, payload, session=get_session(), timeout=timeout,
+                     cache=cache, cached_content=cached)
+
+def extract_section_suggestion(suggestion, section):
+    """Pick the text for one section out of an ask_local_llm result (dict or plain text)"""
+    # Handle JSON response from LLM client
+    if isinstance(suggestion, dict) and 'sections' in suggestion:
+        # Try to match section name case-insensitively
+        section_lower = section.lower()
+        for k, v in suggestion['sections'].items():
+            if k.lower() == section_lower:
+                return v
+        return None
+    # Handle plain text response
+    if isinstance(suggestion, str):
+        return suggestion.strip()
+    return None
+
+def result_sections(result):
+    """
+    Sections of an ask_local_llm result. Plain-text results (JSON that failed to parse, e.g.
+    cut off by max_tokens) are scanned incrementally so fully generated sections are kept.
+    """
+    if isinstance(result, dict) and isinstance(result.get('sections'), dict):
+        return result['sections']
+    if not isinstance(result, str):
+        return {}
+    try:
+        data = json.loads(result)
+        if isinstance(data, dict) and isinstance(data.get('sections'), dict):
+            return data['sections']
+    except json.JSONDecodeError:
+        pass
+    from core.llm_stream import SectionStreamParser
+    parser = SectionStreamParser()
+    sections = dict(parser.feed(result))
+    sections.pop(parser.open_section, None)
+    return sections
+
+def section_errors(result, expected, schema=None):
+    """
+    {section: reason} for every expected section that is missing or invalid in a
+    {'sections': ...} result. Names match case-insensitively. The returned sections are
+    validated together against schema (see schema_errors); a minLength violation is forgiven
+    when the section is at least as long as the original, so short sections are not rejected
+    for being short.
+    """
+    returned = {k.lower(): v for k, v in result_sections(result).items()}
+    names = {name.lower(): name for name in expected}
+    errors = {name: 'missing' for key, name in names.items() if key not in returned}
+    data = {'sections': {key: returned[key] for key in names if key in returned}}
+    for error in schema_errors(data, schema):
+        path = list(error.path)
+        # Errors above section level: a required section is either missing (reported above) or not asked for
+        if len(path) < 2 or path[1] not in names:
+            continue
+        name = names[path[1]]
+        content = data['sections'][path[1]]
+        if (error.validator == 'minLength' and isinstance(content, str)
+                and len(content.strip()) >= len(expected[name].strip())):
+            continue
+        errors.setdefault(name, f"invalid ({error.message})")
+    for key, content in data['sections'].items():
+        if names[key] not in errors and (not isinstance(content, str) or not content.strip()):
+            errors[names[key]] = 'invalid (empty)'
+    return errors
+
 def extract_summary(content):
     """Extract content and suggestions from the plain text response"""
     try:
@@ -146,9 +302,23 @@ def extract_summary(content):
         logger.error(f"Failed to extract summary: {str(e)}")
         return {'content': content, 'suggestions': []}
 
+def schema_errors(data, schema):
+    """jsonschema errors of data against schema (a JSON Schema such as load_cv_schema()); none without a schema"""
+    if not schema:
+        return []
+    # jsonschema is only imported when an answer is checked
+    from jsonschema.validators import validator_for
+    return list(validator_for(schema)(schema).iter_errors(data))
+
 def validate_cv_json(data, schema):
-    """Validate CV JSON data against schema"""
+    """Validate CV JSON data against schema, then check every section has text"""
     try:
+        from jsonschema.exceptions import best_match
+        error = best_match(schema_errors(data, schema))
+        if error is not None:
+            location = '/'.join(str(p) for p in error.path)
+            raise ValueError(f"{location}: {error.message}" if location else error.message)
+
         # Basic structure validation
         if not isinstance(data, dict):
             raise ValueError("Response must be a JSON object")
@@ -165,8 +335,6 @@ def validate_cv_json(data, schema):
             if not isinstance(content, str) or not content.strip():
                 raise ValueError(f"Section '{section_name}' must have non-empty string content")
         
-        # Add more specific validations as needed
-        
         return True, None
     except Exception as e:
         return False, str(e)
@@ -200,7 +368,7 @@ def validate_llm_response(content):
 def check_llm_server(url):
     """Check if LM Studio server is running and responding"""
     try:
-        response = requests.get(f"{url}/v1/models")
+        response = requests.get(f"{url}/v1/models", timeout=5)
         if response.status_code == 200:
             return True
         logger.error(f"LM Studio server check failed with status {response.status_code}")
@@ -209,26 +377,26 @@ def check_llm_server(url):
         logger.error(f"Failed to connect to LM Studio server: {e}")
         return False
 
-def truncate_messages(messages, max_tokens=2048):
+def truncate_messages(messages, max_tokens=N_CTX):
     """Truncate messages to stay within token limit while preserving recent context"""
-    # Approximate tokens (rough estimate: 4 chars = 1 token)
-    char_limit = max_tokens * 4
-    total_chars = 0
+    from core.prompt_budget import MESSAGE_OVERHEAD_TOKENS, get_token_counter
+    counter = get_token_counter()
+    total_tokens = 0
     result = []
-    
+
     # Process messages from most recent to oldest
     for msg in reversed(messages):
-        content_length = len(msg["content"])
-        if total_chars + content_length <= char_limit:
+        msg_tokens = counter.count(msg["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if total_tokens + msg_tokens <= max_tokens:
             result.insert(0, msg)
-            total_chars += content_length
+            total_tokens += msg_tokens
         else:
-            # Truncate the message to fit
-            available_chars = char_limit - total_chars
-            if available_chars > 100:  # Only keep if we can keep a meaningful chunk
+            # Truncate the message to fit, keeping its most recent part
+            available_tokens = max_tokens - total_tokens - MESSAGE_OVERHEAD_TOKENS
+            if available_tokens > 25:  # Only keep if we can keep a meaningful chunk
                 truncated_msg = msg.copy()
-                truncated_msg["content"] = msg["content"][-available_chars:]
+                truncated_msg["content"] = counter.keep_tail(msg["content"], available_tokens)
                 result.insert(0, truncated_msg)
             break
-            
+
     return result if result else [messages[-1]]  # Always keep at least the most recent message
@@ -0,0 +1,157 @@
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from core.llm_client import (DEFAULT_TIMEOUT, ask_local_llm, extract_section_suggestion, last_call_stats,
+                             load_cv_schema, result_sections, section_errors)
+from core.prompt_budget import (PROMPT_LAYOUT, SECTION_RESPONSE_TOKENS, JDCompressor, section_requests,
+                                whole_cv_requests)
+
+logger = logging.getLogger(__name__)
+
+# Match LM Studio's "parallel" slots; more in-flight requests than slots just queue server-side
+DEFAULT_CONCURRENCY = int(os.environ.get('OPERATIONCV_LLM_PARALLEL', 4))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRY_STATUS
+    return False
+
+
+class LLMPool:
+    """
+    Runs many ask_local_llm requests concurrently with a bounded number of in-flight calls.
+    Each worker thread keeps its own keep-alive session (see core.llm_client.get_session),
+    so connections are reused across requests. Transient failures are retried with
+    exponential backoff and jitter.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                 max_retries: int = 3, backoff: float = 1.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm')
+
+    def ask(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7,
+            refresh: bool = False, max_tokens: Optional[int] = None):
+        """Single request with retries; returns what ask_local_llm returns."""
+        attempt = 0
+        while True:
+            try:
+                return ask_local_llm(prompt, system_prompt=system_prompt, temperature=temperature,
+                                     timeout=self.timeout, refresh=refresh, max_tokens=max_tokens)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                logger.warning(f"LLM request failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _ask_with_stats(self, prompt: str, system_prompt: Optional[str], temperature: float, refresh: bool,
+                        max_tokens: Optional[int]):
+        result = self.ask(prompt, system_prompt, temperature, refresh, max_tokens)
+        return result, last_call_stats()
+
+    def _run(self, calls: Sequence[Tuple[Optional[str], str, Optional[int]]], temperature: float,
+             refresh: bool) -> List[Tuple[Optional[object], Optional[Exception], Optional[Dict]]]:
+        """
+        Run (system_prompt, prompt, max_tokens) calls concurrently; (result, error, call stats)
+        in input order.
+        """
+        futures = [self._executor.submit(self._ask_with_stats, prompt, system, temperature, refresh, max_tokens)
+                   for system, prompt, max_tokens in calls]
+        results = []
+        for future in futures:
+            try:
+                (parsed, _), stats = future.result()
+                results.append((parsed, None, stats))
+            except Exception as e:
+                logger.error(f"LLM request failed after retries: {e}")
+                results.append((None, e, None))
+        return results
+
+    def map(self, prompts: Sequence[str], system_prompt: Optional[str] = None,
+            temperature: float = 0.7, refresh: bool = False) -> List[Tuple[Optional[object], Optional[Exception]]]:
+        """
+        Run all prompts concurrently. Returns (result, error) per prompt, in input order;
+        one failing prompt does not cancel the others.
+        """
+        runs = self._run([(system_prompt, p, None) for p in prompts], temperature, refresh)
+        return [(result, error) for result, error, _ in runs]
+
+    def tailor_sections(self, sections: Dict[str, str], jd_text: str, system_prompt: Optional[str] = None,
+                        temperature: float = 0.7, refresh: bool = False, instructions: Optional[str] = None,
+                        layout: str = PROMPT_LAYOUT) -> Dict[str, Dict]:
+        """
+        Tailor every CV section concurrently, so the total time is close to the slowest section.
+        Prompts are budgeted to the context window (see core.prompt_budget.section_requests); with
+        the default shared_prefix layout the JD and industry instructions form one system message
+        reused by every section. Returns {section: {'suggestion', 'error', 'stats'}}, where stats
+        holds the call's prefill time and cached prompt tokens.
+        """
+        prompts = section_requests(sections, jd_text, instructions, system_prompt, layout=layout)
+        return self._tailor(prompts, temperature, refresh)
+
+    def _tailor(self, prompts: Dict[str, Tuple[str, str]], temperature: float, refresh: bool) -> Dict[str, Dict]:
+        out = {}
+        calls = [(system, prompt, SECTION_RESPONSE_TOKENS) for system, prompt in prompts.values()]
+        for name, (result, error, stats) in zip(prompts, self._run(calls, temperature, refresh)):
+            out[name] = {
+                'suggestion': extract_section_suggestion(result, name) if error is None else None,
+                'error': str(error) if error is not None else None,
+                'stats': stats,
+            }
+        return out
+
+    def tailor_cv(self, sections: Dict[str, str], jd_text: str, system_prompt: Optional[str] = None,
+                  temperature: float = 0.7, refresh: bool = False, instructions: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        Tailor the whole CV in one structured generation (more only if the sections do not fit
+        the context window together). The answer is checked against the CV schema; sections that
+        come back missing, empty or truncated are re-requested one by one with the same shared
+        prefix. Returns the same shape as tailor_sections.
+        """
+        compressor = JDCompressor(jd_text)
+        batches = whole_cv_requests(sections, jd_text, instructions, system_prompt, compressor)
+        schema = load_cv_schema()
+        out = {}
+        runs = self._run([(prefix, prompt, max_tokens) for prefix, _, prompt, max_tokens in batches],
+                         temperature, refresh)
+        for (_, names, _, _), (result, error, stats) in zip(batches, runs):
+            if error is not None:
+                continue
+            problems = section_errors(result, {name: sections[name] for name in names}, schema)
+            returned = {k.lower(): v for k, v in result_sections(result).items()}
+            for name in names:
+                if name in problems:
+                    logger.info(f"Section '{name}' {problems[name]} in whole-CV output; re-requesting it")
+                else:
+                    out[name] = {'suggestion': returned[name.lower()], 'error': None, 'stats': stats}
+
+        retry = [name for _, names, _, _ in batches for name in names if name not in out]
+        if retry:
+            prompts = section_requests(sections, jd_text, instructions, system_prompt, compressor)
+            out.update(self._tailor({name: prompts[name] for name in retry}, temperature, refresh))
+        logger.info(f"Tailored {len(out)} sections in {len(batches) + len(retry)} LLM requests")
+        return {name: out[name] for _, names, _, _ in batches for name in names}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
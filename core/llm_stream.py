@@ -0,0 +1,287 @@
+import json
+import logging
+import time
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+THINK_OPEN = '<think>'
+THINK_CLOSE = '</think>'
+JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def prompt_stats(body: Dict, fallback_prefill: Optional[float] = None) -> Dict:
+    """
+    Prompt-processing figures from a completion body or final stream chunk. llama.cpp-based
+    servers report 'timings' (prompt_ms, prompt_n, cache_n); OpenAI-style servers report
+    usage.prompt_tokens_details.cached_tokens. Without server timings, prefill falls back to
+    the caller's estimate (time to first token when streaming).
+    """
+    usage = body.get('usage') or {}
+    timings = body.get('timings') or {}
+    details = usage.get('prompt_tokens_details') or {}
+    prefill = timings['prompt_ms'] / 1000 if timings.get('prompt_ms') is not None else fallback_prefill
+    cached_tokens = timings.get('cache_n', details.get('cached_tokens'))
+    return {
+        'prefill_seconds': round(prefill, 3) if prefill is not None else None,
+        'prompt_tokens': usage.get('prompt_tokens', timings.get('prompt_n')),
+        'cached_prompt_tokens': cached_tokens,
+    }
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for n in range(min(len(text), len(tag) - 1), 0, -1):
+        if text.endswith(tag[:n]):
+            return n
+    return 0
+
+
+class ThinkStripper:
+    """Removes <think>...</think> blocks from streamed text, even when tags span chunks."""
+
+    def __init__(self):
+        self._inside = False
+        self._pending = ''
+
+    def feed(self, text: str) -> str:
+        """Return the visible part of this chunk; partial tags are held back until resolved."""
+        data = self._pending + text
+        self._pending = ''
+        out = []
+        while data:
+            tag = THINK_CLOSE if self._inside else THINK_OPEN
+            idx = data.find(tag)
+            if idx >= 0:
+                if not self._inside:
+                    out.append(data[:idx])
+                data = data[idx + len(tag):]
+                self._inside = not self._inside
+                continue
+            keep = _partial_tag_length(data, tag)
+            if not self._inside:
+                out.append(data[:len(data) - keep])
+            self._pending = data[len(data) - keep:]
+            break
+        return ''.join(out)
+
+    def flush(self) -> str:
+        """Release held-back text at end of stream."""
+        rest = '' if self._inside else self._pending
+        self._pending = ''
+        return rest
+
+
+class SectionStreamParser:
+    """
+    Incremental parser for {"sections": {"name": "text", ...}} output.
+    After each feed(), .sections holds every section seen so far, with the one currently
+    being generated containing its partial (already unescaped) text. Non-JSON input is ignored.
+    """
+
+    def __init__(self):
+        self.sections: Dict[str, str] = {}
+        self._depth = 0
+        self._sections_depth: Optional[int] = None
+        self._in_string = False
+        self._is_value = False
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._buf: List[str] = []
+        self._after_colon = False
+        self._last_key: Optional[str] = None
+        self._current: Optional[str] = None
+
+    @property
+    def open_section(self) -> Optional[str]:
+        """Section whose text is still incomplete (e.g. cut off by max_tokens), if any."""
+        return self._current
+
+    def feed(self, chunk: str) -> Dict[str, str]:
+        for c in chunk:
+            if self._in_string:
+                self._string_char(c)
+            elif c == '"':
+                self._in_string = True
+                self._is_value = self._after_colon
+                self._buf = []
+                if self._is_value and self._depth == self._sections_depth and self._last_key is not None:
+                    self._current = self._last_key
+            elif c == '{':
+                self._depth += 1
+                if self._after_colon and self._last_key == 'sections' and self._depth == 2:
+                    self._sections_depth = 2
+                self._after_colon = False
+            elif c == '}':
+                if self._depth == self._sections_depth:
+                    self._sections_depth = None
+                self._depth -= 1
+            elif c == ':':
+                self._after_colon = True
+            elif c == ',':
+                self._after_colon = False
+        if self._current is not None:
+            self.sections[self._current] = ''.join(self._buf)
+        return self.sections
+
+    def _string_char(self, c: str):
+        if self._escape is not None:
+            self._escape += c
+            if self._escape[0] != 'u':
+                self._buf.append(JSON_ESCAPES.get(c, c))
+                self._escape = None
+            elif len(self._escape) == 5:
+                self._append_codepoint(int(self._escape[1:], 16))
+                self._escape = None
+            return
+        if c == '\\':
+            self._escape = ''
+        elif c == '"':
+            self._end_string()
+        else:
+            self._buf.append(c)
+
+    def _append_codepoint(self, code: int):
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._buf.append(chr(code))
+
+    def _end_string(self):
+        text = ''.join(self._buf)
+        self._in_string = False
+        if self._is_value:
+            if self._current is not None:
+                self.sections[self._current] = text
+            self._current = None
+            self._after_colon = False
+        else:
+            self._last_key = text
+
+
+class LLMStream:
+    """
+    One streaming chat completion against an OpenAI-compatible server (SSE).
+    Iterating yields visible text deltas; stats reports time-to-first-token, prefill time,
+    cached prompt tokens and tokens/sec.
+    """
+
+    def __init__(self, url: str, payload: Dict, session: Optional[requests.Session] = None, timeout=None,
+                 cache=None, cached_content: Optional[str] = None):
+        self.url = url
+        self.payload = payload
+        self.session = session
+        self.timeout = timeout
+        self.cache = cache
+        self.cached_content = cached_content
+        self.text = ''
+        self.raw = ''
+        self.sections: Dict[str, str] = {}
+        self.stats: Dict = {}
+        self._done = False
+        self._events_iter: Optional[Iterator[str]] = None
+
+    def __iter__(self) -> Iterator[str]:
+        # A single underlying request: iterating again resumes rather than re-sending
+        if self._events_iter is None:
+            self._events_iter = self._events()
+        return self._events_iter
+
+    def _replay(self) -> Iterator[str]:
+        """Serve a cached completion as a single chunk."""
+        stripper = ThinkStripper()
+        parser = SectionStreamParser()
+        self.raw = self.cached_content
+        self.text = stripper.feed(self.raw) + stripper.flush()
+        self.sections = dict(parser.feed(self.text))
+        self.stats = {'ttft_seconds': 0.0, 'total_seconds': 0.0, 'tokens': None, 'tokens_per_second': None,
+                      'prefill_seconds': 0.0, 'prompt_tokens': None, 'cached_prompt_tokens': None, 'cached': True}
+        self._done = True
+        if self.text:
+            yield self.text
+
+    def _events(self) -> Iterator[str]:
+        if self.cached_content is not None:
+            yield from self._replay()
+            return
+        stripper = ThinkStripper()
+        parser = SectionStreamParser()
+        raw_parts, text_parts = [], []
+        chunks = 0
+        usage_tokens = None
+        final_event: Dict = {}
+        first_token_at = None
+        finish_reason = None
+        poster = self.session.post if self.session is not None else requests.post
+        start = time.perf_counter()
+        with poster(self.url, json=self.payload, headers={"Content-Type": "application/json"},
+                    stream=True, timeout=self.timeout) as response:
+            if response.status_code != 200:
+                logger.error(f"LM Studio API Error: Status {response.status_code}")
+                logger.error(f"Response content: {response.text}")
+                response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                event = json.loads(data)
+                if event.get('usage'):
+                    usage_tokens = event['usage'].get('completion_tokens')
+                    final_event['usage'] = event['usage']
+                if event.get('timings'):
+                    final_event['timings'] = event['timings']
+                choices = event.get('choices') or []
+                if choices and choices[0].get('finish_reason'):
+                    finish_reason = choices[0]['finish_reason']
+                delta = choices[0].get('delta', {}).get('content') if choices else None
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                chunks += 1
+                raw_parts.append(delta)
+                visible = stripper.feed(delta)
+                if visible:
+                    text_parts.append(visible)
+                    self.sections = dict(parser.feed(visible))
+                    self.text = ''.join(text_parts)
+                    yield visible
+        tail = stripper.flush()
+        if tail:
+            text_parts.append(tail)
+            self.sections = dict(parser.feed(tail))
+            yield tail
+        end = time.perf_counter()
+        self.raw = ''.join(raw_parts)
+        self.text = ''.join(text_parts)
+        tokens = usage_tokens or chunks
+        generation = end - first_token_at if first_token_at is not None else 0.0
+        ttft = first_token_at - start if first_token_at is not None else None
+        self.stats = {
+            'ttft_seconds': round(ttft, 3) if ttft is not None else None,
+            'total_seconds': round(end - start, 3),
+            'tokens': tokens,
+            'tokens_per_second': round(tokens / generation, 1) if generation > 0 else None,
+            **prompt_stats(final_event, fallback_prefill=ttft),
+            'cached': False,
+        }
+        self._done = True
+        if self.cache is not None and self.raw:
+            self.cache.put(self.payload, self.raw, end - start, finish_reason)
+        logger.info(f"LLM stream finished: {self.stats}")
+
+    def result(self):
+        """Consume any remaining stream and return (parsed, None) like ask_local_llm."""
+        if not self._done:
+            for _ in self:
+                pass
+        from core.llm_client import parse_llm_content
+        logger.info(f"Raw LLM response: {self.raw}")
+        return parse_llm_content(self.text), None
@@ -1,67 +1,69 @@
-from sentence_transformers import SentenceTransformer, util
-import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-MODEL_NAME = 'all-MiniLM-L6-v2'
+import numpy as np
+
+from core.embeddings import MODEL_NAME, resolve_engine
+from core.lexical import get_lexical_index
+from core.scorer import ENCODE_BATCH_SIZE
+from core.skills import get_skill_taxonomy
 
 def extract_skills_and_requirements(text: str) -> List[str]:
-    """Extract skills and requirements from text."""
-    skills = set()
-    for line in text.splitlines():
-        if re.search(r'skills|competenze|abilities|compétences|requirements|qualifications', line, re.IGNORECASE):
-            # Split by common delimiters
-            parts = re.split(r'[,:;•\n]', line)
-            # Clean and add each skill
-            for part in parts:
-                clean = part.strip().lower()
-                if len(clean) > 2 and not re.match(r'^(and|or|the|skills|required|preferred)$', clean):
-                    skills.add(clean)
-    return list(skills)
+    """Taxonomy skills mentioned in text (see core.skills), most mentioned first."""
+    taxonomy = get_skill_taxonomy()
+    return taxonomy.skill_names(taxonomy.counts(text))
 
 def get_semantic_similarity(cv_text: str, jd_text: str, model=None) -> float:
     """Compute semantic similarity between CV and job description."""
-    if model is None:
-        model = SentenceTransformer(MODEL_NAME)
-    emb = model.encode([cv_text, jd_text], convert_to_tensor=True)
-    sim = float(util.pytorch_cos_sim(emb[0], emb[1]).item())
+    engine = resolve_engine(model, MODEL_NAME)
+    sim = engine.similarity(cv_text, jd_text)
     return (sim + 1) / 2  # Normalize to 0-1
 
 def analyze_missing_skills(cv_text: str, jd_text: str) -> Tuple[List[str], List[str], List[str]]:
     """Analyze which skills are missing or could be emphasized."""
-    cv_skills = set(extract_skills_and_requirements(cv_text))
-    jd_skills = set(extract_skills_and_requirements(jd_text))
-    
-    missing = list(jd_skills - cv_skills)
-    matching = list(cv_skills & jd_skills)
-    extra = list(cv_skills - jd_skills)
-    
-    return missing, matching, extra
+    taxonomy = get_skill_taxonomy()
+    result = _build_result(0.0, 0.0, 0.0, taxonomy.counts(cv_text), taxonomy.counts(jd_text))
+    return result['missing_skills'], result['matching_skills'], result['extra_skills']
 
-def compute_interview_probability(cv_text: str, jd_text: str, model=None) -> Dict:
+def compute_interview_probability(cv_text: str, jd_text: str, model=None,
+                                  semantic_score: Optional[float] = None) -> Dict:
     """
     Compute probability of getting an interview based on CV and job description match.
     Returns a dict with probability score and component scores.
+    Pass semantic_score (0-1) when the embeddings were already computed, e.g. by
+    core.scorer.score_documents, to skip encoding entirely.
     """
-    if model is None:
-        model = SentenceTransformer(MODEL_NAME)
-
     # Compute base semantic similarity (50% weight)
-    semantic_score = get_semantic_similarity(cv_text, jd_text, model)
-    
-    # Analyze skills overlap (30% weight)
-    missing, matching, extra = analyze_missing_skills(cv_text, jd_text)
-    jd_skills = extract_skills_and_requirements(jd_text)
-    skill_coverage = len(matching) / max(1, len(jd_skills)) if jd_skills else 0.0
-    
-    # Calculate keyword density score (20% weight)
-    keywords = set(jd_skills)
-    if keywords:
-        cv_words = set(w.lower() for w in cv_text.split())
-        keyword_matches = len(cv_words.intersection(keywords))
-        keyword_density = min(1.0, keyword_matches / len(keywords))
-    else:
-        keyword_density = 0.0
+    if semantic_score is None:
+        semantic_score = get_semantic_similarity(cv_text, jd_text, model)
     
+    taxonomy = get_skill_taxonomy()
+    cv_counts, jd_counts = taxonomy.counts(cv_text), taxonomy.counts(jd_text)
+    skill_coverage = skill_coverage_matrix(cv_counts[None, :], jd_counts[None, :])[0, 0]
+    keyword_density = get_lexical_index().scores([cv_text], [jd_text])[0, 0]
+    return _build_result(semantic_score, float(skill_coverage), float(keyword_density), cv_counts, jd_counts)
+
+def skill_coverage_matrix(cv_counts: np.ndarray, jd_counts: np.ndarray) -> np.ndarray:
+    """
+    Share of each JD's distinct skills that each CV mentions, from skill mention vectors
+    (SkillTaxonomy.counts) stacked as rows: an (n_cvs, n_jds) array, 0 for JDs without skills.
+    """
+    jd_present = (jd_counts > 0).astype(np.float32)
+    matched = (cv_counts > 0).astype(np.float32) @ jd_present.T
+    jd_skills = jd_present.sum(axis=1)
+    return np.divide(matched, jd_skills, out=np.zeros_like(matched), where=jd_skills > 0)
+
+def _build_result(semantic_score: float, skill_coverage: float, keyword_density: float,
+                  cv_counts: np.ndarray, jd_counts: np.ndarray) -> Dict:
+    """
+    Combine the semantic score with skill coverage (30%) and keyword density (20%, the BM25
+    lexical overlap from core.lexical) into the result dict.
+    """
+    taxonomy = get_skill_taxonomy()
+    cv_present = cv_counts > 0
+    missing = taxonomy.skill_names(np.where(cv_present, 0, jd_counts))
+    matching = taxonomy.skill_names(np.where(cv_present, jd_counts, 0))
+    extra = taxonomy.skill_names(np.where(jd_counts > 0, 0, cv_counts))
+
     # Calculate final weighted probability
     prob = (0.5 * semantic_score) + (0.3 * skill_coverage) + (0.2 * keyword_density)
     
@@ -74,3 +76,61 @@ def compute_interview_probability(cv_text: str, jd_text: str, model=None) -> Dic
         'matching_skills': matching,
         'extra_skills': extra
     }
+
+def _as_named(docs: Union[Sequence[str], Dict[str, str]], prefix: str) -> Tuple[List[str], List[str]]:
+    """Accept a list of texts or an id->text dict; return (ids, texts)."""
+    if isinstance(docs, dict):
+        return list(docs.keys()), list(docs.values())
+    texts = list(docs)
+    return [f"{prefix}{i}" for i in range(len(texts))], texts
+
+def compute_probability_matrix(cv_texts: Union[Sequence[str], Dict[str, str]],
+                               jd_texts: Union[Sequence[str], Dict[str, str]],
+                               model=None, batch_size: int = ENCODE_BATCH_SIZE) -> Dict:
+    """
+    Score N CVs against M job descriptions.
+    Every document is embedded exactly once (one batched encode call over all their chunks,
+    see EmbeddingEngine.encode_documents) and the N x M
+    semantic matrix comes from a single matrix multiply. Skills are matched once per
+    document; skill coverage and keyword density (core.lexical) are N x M matrix products too. Returns:
+      - 'cv_ids', 'jd_ids': row / column labels
+      - 'semantic': N x M array of semantic scores (0-1)
+      - 'probability': N x M array of interview probabilities
+      - 'ranking': list of per-pair result dicts (same keys as compute_interview_probability
+        plus 'cv_id' and 'jd_id'), sorted by probability, best first
+    """
+    cv_ids, cvs = _as_named(cv_texts, 'cv_')
+    jd_ids, jds = _as_named(jd_texts, 'jd_')
+    n, m = len(cvs), len(jds)
+    if n == 0 or m == 0:
+        empty = np.zeros((n, m), dtype=np.float32)
+        return {'cv_ids': cv_ids, 'jd_ids': jd_ids, 'semantic': empty, 'probability': empty, 'ranking': []}
+
+    engine = resolve_engine(model, MODEL_NAME)
+    emb = engine.encode_documents(cvs + jds, batch_size=batch_size)
+    semantic = (emb[:n] @ emb[n:].T + 1) / 2  # Normalize to 0-1
+
+    taxonomy = get_skill_taxonomy()
+    cv_counts = np.stack([taxonomy.counts(text) for text in cvs])
+    jd_counts = np.stack([taxonomy.counts(text) for text in jds])
+
+    coverage = skill_coverage_matrix(cv_counts, jd_counts)
+    density = get_lexical_index().scores(cvs, jds)
+
+    probability = np.zeros((n, m), dtype=np.float32)
+    ranking = []
+    for i in range(n):
+        for j in range(m):
+            result = _build_result(float(semantic[i, j]), float(coverage[i, j]), float(density[i, j]), cv_counts[i], jd_counts[j])
+            result['cv_id'] = cv_ids[i]
+            result['jd_id'] = jd_ids[j]
+            probability[i, j] = result['probability']
+            ranking.append(result)
+    ranking.sort(key=lambda r: (r['probability'], r['semantic_score']), reverse=True)
+    return {
+        'cv_ids': cv_ids,
+        'jd_ids': jd_ids,
+        'semantic': semantic,
+        'probability': probability,
+        'ranking': ranking,
+    }
@@ -0,0 +1,320 @@
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.llm_client import DEFAULT_SYSTEM_PROMPT, LLM_URL, N_CTX, get_session
+from core.prompt_utils import build_section_prompt, build_section_request, build_shared_prefix
+
+logger = logging.getLogger(__name__)
+
+# Room left in n_ctx for the model's answer to a single-section request; also sent as its max_tokens
+SECTION_RESPONSE_TOKENS = 512
+# Chat-template overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Used when the LLM's tokenizer is unavailable. Fewer bytes per token than the ~4 characters of
+# English prose in common LLM vocabularies, and every digit a token of its own (as in Llama 2 and
+# Mistral), so the estimate overcounts and prompts err on the short side rather than overflow n_ctx
+ESTIMATE_BYTES_PER_TOKEN = 3
+# llama.cpp server's tokenizer endpoint, next to the OpenAI-compatible API
+TOKENIZE_URL = os.environ.get('OPERATIONCV_LLM_TOKENIZE_URL', LLM_URL.split('/v1/')[0] + '/tokenize')
+TOKENIZE_TIMEOUT = (2, 10)
+SERVER_COUNT_CACHE_SIZE = 4096
+# 'shared_prefix': system prompt + industry guidance + JD first, identical for every section, so
+# the server reuses its KV cache; 'inline': the original per-section prompt with the JD last
+PROMPT_LAYOUTS = ('shared_prefix', 'inline')
+# Expected answer length relative to the sections sent when tailoring several at once
+WHOLE_CV_RESPONSE_RATIO = 1.5
+PROMPT_LAYOUT = os.environ.get('OPERATIONCV_PROMPT_LAYOUT', 'shared_prefix')
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?;])\s+|\n+')
+
+
+class TokenCounter:
+    """
+    Counts LLM prompt tokens. Uses, in order of preference: the LLM's own tokenizer named by
+    OPERATIONCV_LLM_TOKENIZER (a tokenizer.json file or directory, or a Hugging Face id, read
+    with the `tokenizers` library), the server's llama.cpp /tokenize endpoint, or the
+    deliberately high estimate_tokens. Server counts are cached per text.
+    """
+
+    def __init__(self, tokenizer=None, tokenize_url: Optional[str] = TOKENIZE_URL):
+        self._tokenizer = tokenizer
+        self._tokenize_url = tokenize_url
+        self._mode = 'tokenizer' if tokenizer is not None else None
+        self._lock = threading.Lock()
+        self._server_counts = lru_cache(maxsize=SERVER_COUNT_CACHE_SIZE)(self._server_count)
+
+    @property
+    def mode(self) -> str:
+        """'tokenizer', 'server' or 'estimate', decided on first use."""
+        if self._mode is None:
+            with self._lock:
+                if self._mode is None:
+                    self._mode = self._detect()
+        return self._mode
+
+    def _detect(self) -> str:
+        name = os.environ.get('OPERATIONCV_LLM_TOKENIZER')
+        if name:
+            try:
+                from tokenizers import Tokenizer
+                if os.path.isdir(name):
+                    name = os.path.join(name, 'tokenizer.json')
+                self._tokenizer = Tokenizer.from_file(name) if os.path.isfile(name) else Tokenizer.from_pretrained(name)
+                return 'tokenizer'
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer {name}: {e}")
+        if self._tokenize_url:
+            try:
+                self._server_count('probe')
+                return 'server'
+            except Exception as e:
+                logger.warning(f"No token count endpoint at {self._tokenize_url} ({e})")
+        logger.warning("Counting LLM tokens with a conservative estimate, so prompts use less of the context "
+                       "window than they could; set OPERATIONCV_LLM_TOKENIZER to the model's tokenizer.json "
+                       "for exact counts")
+        return 'estimate'
+
+    def _server_count(self, text: str) -> int:
+        response = get_session().post(self._tokenize_url, json={'content': text, 'add_special': False},
+                                      timeout=TOKENIZE_TIMEOUT)
+        response.raise_for_status()
+        return len(response.json()['tokens'])
+
+    def count(self, text: str) -> int:
+        mode = self.mode
+        if mode == 'tokenizer':
+            return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+        if mode == 'server':
+            try:
+                return self._server_counts(text)
+            except Exception as e:
+                logger.warning(f"Token count request failed, using the conservative estimate from now on: {e}")
+                self._mode = 'estimate'
+        return estimate_tokens(text)
+
+    def count_messages(self, messages: List[Dict]) -> int:
+        return sum(self.count(m['content']) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def keep_head(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text that fits in max_tokens."""
+        return self._cut(text, max_tokens, from_end=False)
+
+    def keep_tail(self, text: str, max_tokens: int) -> str:
+        """Longest suffix of text that fits in max_tokens."""
+        return self._cut(text, max_tokens, from_end=True)
+
+    def _cut(self, text: str, max_tokens: int, from_end: bool) -> str:
+        if max_tokens <= 0:
+            return ''
+        if self.mode == 'tokenizer':
+            offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+            if len(offsets) <= max_tokens:
+                return text
+            if from_end:
+                return text[offsets[len(offsets) - max_tokens][0]:]
+            return text[:offsets[max_tokens - 1][1]]
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+        # Cut in proportion to the token count, then shrink until the piece fits
+        chars = len(text) * max_tokens // total
+        while True:
+            piece = text[len(text) - chars:] if from_end else text[:chars]
+            if chars <= 0 or self.count(piece) <= max_tokens:
+                return piece
+            chars = chars * 9 // 10
+
+
+def estimate_tokens(text: str) -> int:
+    """Upper-end token estimate: one per digit, plus one per ESTIMATE_BYTES_PER_TOKEN UTF-8 bytes of the rest."""
+    digits = sum(text.count(d) for d in '0123456789')
+    rest = len(text.encode('utf-8')) - digits
+    return digits + (rest + ESTIMATE_BYTES_PER_TOKEN - 1) // ESTIMATE_BYTES_PER_TOKEN
+
+
+_counter: Optional[TokenCounter] = None
+
+
+def get_token_counter() -> TokenCounter:
+    """Process-wide token counter (tokenizer loads on first count)."""
+    global _counter
+    if _counter is None:
+        _counter = TokenCounter()
+    return _counter
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a JD into sentences / bullet lines."""
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+
+
+class JDCompressor:
+    """
+    Picks the sentences of a job description most similar to a given CV section (or, for a
+    shared prefix, the whole CV) that fit a token budget, keeping them in their original order. The JD is split and embedded once,
+    the first time it does not fit a budget; a JD that always fits is never embedded.
+    """
+
+    def __init__(self, jd_text: str, model=None, counter: Optional[TokenCounter] = None):
+        self.jd_text = jd_text
+        self.model = model
+        self.counter = counter or get_token_counter()
+        self.total_tokens = self.counter.count(jd_text)
+        self.engine = None
+        self.sentences: List[str] = []
+        self.sentence_tokens: List[int] = []
+        self._embeddings = None
+        self._lock = threading.Lock()
+
+    def _prepare(self):
+        with self._lock:
+            if self.engine is not None:
+                return
+            from core.embeddings import resolve_engine
+            engine = resolve_engine(self.model)
+            self.sentences = split_sentences(self.jd_text)
+            self.sentence_tokens = [self.counter.count(s) for s in self.sentences]
+            self._embeddings = engine.encode_documents(self.sentences) if self.sentences else None
+            self.engine = engine
+
+    def compress(self, query: str, max_tokens: int) -> str:
+        """JD text relevant to query within max_tokens; the full JD if it already fits."""
+        if self.total_tokens <= max_tokens:
+            return self.jd_text
+        self._prepare()
+        if not self.sentences or max_tokens <= 0:
+            return ''
+        # The query may be the whole CV (shared_prefix layout): read it in chunks, not just its head
+        scores = self._embeddings @ self.engine.encode_documents([query])[0]
+        chosen, used = [], 0
+        for idx in np.argsort(-scores):
+            # +1 for the newline joining sentences
+            cost = self.sentence_tokens[idx] + 1
+            if used + cost <= max_tokens:
+                chosen.append(idx)
+                used += cost
+        return '\n'.join(self.sentences[i] for i in sorted(chosen))
+
+
+def budget_section_prompt(section: str, content: str, jd_text: str, system_prompt: Optional[str] = None,
+                          compressor: Optional[JDCompressor] = None, n_ctx: int = N_CTX,
+                          response_tokens: int = SECTION_RESPONSE_TOKENS,
+                          counter: Optional[TokenCounter] = None) -> str:
+    """
+    Build the single-section tailoring prompt so that system + user messages plus the
+    reserved answer tokens fit in n_ctx. The JD is compressed to the sentences most relevant
+    to the section only when it does not fit verbatim; an oversized section is cut last.
+    """
+    counter = counter or get_token_counter()
+    budget = n_ctx - response_tokens - counter.count(system_prompt or DEFAULT_SYSTEM_PROMPT) \
+        - 2 * MESSAGE_OVERHEAD_TOKENS
+    skeleton = counter.count(build_section_prompt(section, '', ''))
+    content_tokens = counter.count(content)
+    jd_budget = budget - skeleton - content_tokens
+    if jd_budget < budget // 4:
+        # Section alone would crowd out the JD: give each half of what is left
+        content = counter.keep_head(content, (budget - skeleton) // 2)
+        jd_budget = budget - skeleton - counter.count(content)
+    if compressor is None or compressor.jd_text != jd_text:
+        compressor = JDCompressor(jd_text, counter=counter)
+    jd = compressor.compress(f"{section}\n{content}", jd_budget)
+    if jd != jd_text:
+        logger.info(f"Compressed JD from {compressor.total_tokens} to {counter.count(jd)} tokens for '{section}'")
+    return build_section_prompt(section, content, jd)
+
+
+def section_requests(sections: Dict[str, str], jd_text: str, instructions: Optional[str] = None,
+                     system_prompt: Optional[str] = None, compressor: Optional[JDCompressor] = None,
+                     layout: str = PROMPT_LAYOUT, n_ctx: int = N_CTX,
+                     response_tokens: int = SECTION_RESPONSE_TOKENS,
+                     counter: Optional[TokenCounter] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    (system_prompt, prompt) per non-empty section, budgeted to n_ctx.
+    With the shared_prefix layout every section gets the same system message, so the JD is
+    compressed at most once (against the whole CV) rather than per section, and the section
+    text alone goes in the user message. Build with the full set of CV sections even when
+    sending just one, so the prefix matches what other calls for this JD already sent.
+    """
+    if layout not in PROMPT_LAYOUTS:
+        raise ValueError(f"Unknown prompt layout: {layout}")
+    counter = counter or get_token_counter()
+    system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
+    names = [name for name, content in sections.items() if content.strip()]
+    if not names:
+        return {}
+    if compressor is None or compressor.jd_text != jd_text:
+        compressor = JDCompressor(jd_text, counter=counter)
+    if layout == 'inline':
+        return {name: (system_prompt, budget_section_prompt(name, sections[name], jd_text, system_prompt,
+                                                            compressor, n_ctx, response_tokens, counter))
+                for name in names}
+
+    prefix, user_prompts = _shared_prefix(sections, names, jd_text, instructions, system_prompt, compressor,
+                                          n_ctx, response_tokens, counter)
+    return {name: (prefix, request) for name, request in user_prompts.items()}
+
+
+def _shared_prefix(sections: Dict[str, str], names: List[str], jd_text: str, instructions: Optional[str],
+                   system_prompt: str, compressor: JDCompressor, n_ctx: int, response_tokens: int,
+                   counter: TokenCounter) -> Tuple[str, Dict[str, str]]:
+    """The shared system message for a CV/JD pair, plus the per-section user messages it was sized for."""
+    budget = n_ctx - response_tokens - 2 * MESSAGE_OVERHEAD_TOKENS
+    skeleton = counter.count(build_shared_prefix('', system_prompt, instructions))
+    # No single section may take more than half of what the JD could otherwise use
+    section_cap = (budget - skeleton) // 2
+    user_prompts = {}
+    for name in names:
+        request = build_section_request(name, sections[name])
+        if counter.count(request) > section_cap:
+            request = build_section_request(name, counter.keep_head(sections[name], section_cap))
+        user_prompts[name] = request
+    jd_budget = budget - skeleton - max(counter.count(r) for r in user_prompts.values())
+    jd = compressor.compress('\n'.join(sections[name] for name in names), jd_budget)
+    if jd != jd_text:
+        logger.info(f"Compressed shared JD prefix from {compressor.total_tokens} to {counter.count(jd)} tokens")
+    return build_shared_prefix(jd, system_prompt, instructions), user_prompts
+
+
+def whole_cv_requests(sections: Dict[str, str], jd_text: str, instructions: Optional[str] = None,
+                      system_prompt: Optional[str] = None, compressor: Optional[JDCompressor] = None,
+                      n_ctx: int = N_CTX, counter: Optional[TokenCounter] = None) -> List[Tuple[str, List[str], str, int]]:
+    """
+    Pack all non-empty sections into as few (system_prompt, section names, prompt, max_tokens)
+    requests as the context window allows, normally one. Each request leaves room for an answer
+    about WHOLE_CV_RESPONSE_RATIO times as long as its sections, and max_tokens is that reserve.
+    The system message is the same shared prefix section_requests builds, so per-section
+    retries reuse its KV cache.
+    """
+    counter = counter or get_token_counter()
+    system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
+    names = [name for name, content in sections.items() if content.strip()]
+    if not names:
+        return []
+    if compressor is None or compressor.jd_text != jd_text:
+        compressor = JDCompressor(jd_text, counter=counter)
+    prefix, user_prompts = _shared_prefix(sections, names, jd_text, instructions, system_prompt, compressor,
+                                          n_ctx, SECTION_RESPONSE_TOKENS, counter)
+    available = n_ctx - counter.count(prefix) - 2 * MESSAGE_OVERHEAD_TOKENS
+
+    def reserve(tokens: int) -> int:
+        return max(SECTION_RESPONSE_TOKENS, int(tokens * WHOLE_CV_RESPONSE_RATIO))
+
+    groups: List[List[str]] = []
+    sizes: List[int] = []
+    for name in names:
+        tokens = counter.count(user_prompts[name])
+        if groups and sizes[-1] + tokens + reserve(sizes[-1] + tokens) <= available:
+            groups[-1].append(name)
+            sizes[-1] += tokens
+        else:
+            groups.append([name])
+            sizes.append(tokens)
+    # A lone oversized section gets whatever room is left rather than overrunning n_ctx
+    return [(prefix, group, '\n'.join(user_prompts[name] for name in group), min(reserve(size), available - size))
+            for group, size in zip(groups, sizes)]
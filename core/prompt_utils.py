@@ -1,3 +1,34 @@
+def build_section_prompt(section, content, jd_text):
+    """Prompt asking the LLM to tailor one CV section to a job description."""
+    return f"""Analyze this CV section and suggest improvements to match the job description.
+Keep the facts the same but rephrase to highlight relevant experience and skills.
+
+Section: {section}
+Current Content: {content}
+
+Job Description: {jd_text}
+"""
+
+def build_shared_prefix(jd_text, system_prompt, instructions=None):
+    """
+    System message shared by every section request for one JD. It must stay byte-identical
+    between calls so the server can reuse the prompt's KV cache, so nothing per-section goes here.
+    """
+    parts = [system_prompt.strip()]
+    if instructions:
+        parts.append(f"Industry guidance: {instructions.strip()}")
+    parts.append(f"Job Description:\n{jd_text.strip()}")
+    parts.append("Analyze the CV section or sections in the next message and suggest improvements to match the "
+                 "job description.\nKeep the facts the same but rephrase to highlight relevant experience and skills.\n"
+                 "Return every section you are given, under its original name.")
+    return "\n\n".join(parts)
+
+def build_section_request(section, content):
+    """Per-section user message appended after the shared prefix."""
+    return f"""Section: {section}
+Current Content: {content}
+"""
+
 def load_prompt(path):
     """Load a prompt from a text file."""
     with open(path, "r", encoding="utf-8") as f:
@@ -1,19 +1,22 @@
-import re
-from docx import Document
-import os
-from fpdf import FPDF
-from core.scorer import section_relevance
+import io
+
+from core.file_utils import atomic_write
+from core.sections import title_pattern
+
+# python-docx, fpdf and the scorer (and with it the embedding model) are imported inside
+# the export functions so that importing this module stays cheap.
+
+DEFAULT_SECTION_TITLES = ('summary', 'experience', 'skills', 'education', 'projects', 'certifications', 'languages', 'interests')
+# Compiled at import; other title tuples are compiled once on first use
+title_pattern(DEFAULT_SECTION_TITLES)
 
 def split_sections(cv_text, section_titles=None):
     """
     Split CV text into sections using regex based on section titles.
     Returns a list of (section_title, section_text).
     """
-    if section_titles is None:
-        section_titles = ['summary', 'experience', 'skills', 'education', 'projects', 'certifications', 'languages', 'interests']
-    # Build regex pattern for section headers
-    pattern = r'(^|\n)(' + '|'.join([re.escape(title) for title in section_titles]) + r')[:\n]'
-    matches = list(re.finditer(pattern, cv_text, re.IGNORECASE))
+    section_titles = DEFAULT_SECTION_TITLES if section_titles is None else tuple(section_titles)
+    matches = list(title_pattern(section_titles).finditer(cv_text))
     sections = []
     for i, match in enumerate(matches):
         start = match.end()
@@ -26,58 +29,71 @@ def split_sections(cv_text, section_titles=None):
         sections = [("full", cv_text.strip())]
     return sections
 
-def save_cv_to_docx(cv_text, output_path, section_titles=None, jd_text=None, highlight_relevance=False):
+def _relevance_extremes(sections, jd_text):
+    """Indices of the most and least JD-relevant sections"""
+    from core.scorer import section_relevance
+    scores = section_relevance({str(i): text for i, (_, text) in enumerate(sections)}, jd_text)
+    if not scores:
+        return None, None
+    ranked = sorted(scores, key=scores.get)
+    return int(ranked[-1]), int(ranked[0])
+
+def build_docx(cv_text, section_titles=None, jd_text=None, highlight_relevance=False):
     """
-    Save the tailored CV text to a DOCX file, preserving custom sections and optionally highlighting relevance.
-    If highlight_relevance is True and jd_text is provided, most/least relevant sections are bolded/italicized.
+    Build a plain python-docx Document with one heading per section.
+    If highlight_relevance is True and jd_text is provided, the most/least relevant sections are bolded/italicized.
     """
+    from docx import Document
     doc = Document()
     sections = split_sections(cv_text, section_titles)
-    top_sections, bottom_sections = ([], [])
-    if highlight_relevance and jd_text:
-        section_texts = [s[1] for s in sections]
-        top, bottom = section_relevance(section_texts, jd_text, top_n=1)
-        top_sections = [t[0] for t in top]
-        bottom_sections = [b[0] for b in bottom]
-    for title, text in sections:
+    top, bottom = _relevance_extremes(sections, jd_text) if highlight_relevance and jd_text else (None, None)
+    for i, (title, text) in enumerate(sections):
         doc.add_heading(title, level=1)
-        p = doc.add_paragraph(text)
-        if highlight_relevance and jd_text:
-            if text in top_sections:
-                p.bold = True
-            elif text in bottom_sections:
-                p.italic = True
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    doc.save(output_path)
+        run = doc.add_paragraph().add_run(text)
+        if i == top:
+            run.bold = True
+        elif i == bottom:
+            run.italic = True
+    return doc
 
-def save_cv_to_pdf(cv_text, output_path, section_titles=None, jd_text=None, highlight_relevance=False):
+def build_pdf_bytes(cv_text, section_titles=None, jd_text=None, highlight_relevance=False):
     """
-    Save the tailored CV text to a PDF file, preserving custom sections and optionally highlighting relevance.
-    If highlight_relevance is True and jd_text is provided, most/least relevant sections are bolded/italicized.
+    Render the CV as PDF bytes with fpdf.
+    If highlight_relevance is True and jd_text is provided, the most/least relevant sections are bolded/italicized.
     """
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
     pdf.set_font("Arial", size=12)
     sections = split_sections(cv_text, section_titles)
-    top_sections, bottom_sections = ([], [])
-    if highlight_relevance and jd_text:
-        section_texts = [s[1] for s in sections]
-        top, bottom = section_relevance(section_texts, jd_text, top_n=1)
-        top_sections = [t[0] for t in top]
-        bottom_sections = [b[0] for b in bottom]
-    for title, text in sections:
+    top, bottom = _relevance_extremes(sections, jd_text) if highlight_relevance and jd_text else (None, None)
+    for i, (title, text) in enumerate(sections):
         pdf.set_font("Arial", 'B', 14)
         pdf.cell(0, 10, title, ln=True)
-        if highlight_relevance and jd_text:
-            if text in top_sections:
-                pdf.set_font("Arial", 'B', 12)
-            elif text in bottom_sections:
-                pdf.set_font("Arial", 'I', 12)
-            else:
-                pdf.set_font("Arial", size=12)
+        if i == top:
+            pdf.set_font("Arial", 'B', 12)
+        elif i == bottom:
+            pdf.set_font("Arial", 'I', 12)
         else:
             pdf.set_font("Arial", size=12)
         pdf.multi_cell(0, 10, text)
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    pdf.output(output_path)
+    # fpdf 1.x returns a latin-1 str, fpdf2 a bytearray
+    out = pdf.output(dest='S')
+    return out.encode('latin-1') if isinstance(out, str) else bytes(out)
+
+def save_cv_to_docx(cv_text, output_path, section_titles=None, jd_text=None, highlight_relevance=False):
+    """
+    Save the tailored CV text to a DOCX file, preserving custom sections and optionally highlighting relevance.
+    If highlight_relevance is True and jd_text is provided, most/least relevant sections are bolded/italicized.
+    """
+    buffer = io.BytesIO()
+    build_docx(cv_text, section_titles, jd_text, highlight_relevance).save(buffer)
+    atomic_write(output_path, buffer.getbuffer())
+
+def save_cv_to_pdf(cv_text, output_path, section_titles=None, jd_text=None, highlight_relevance=False):
+    """
+    Save the tailored CV text to a PDF file, preserving custom sections and optionally highlighting relevance.
+    If highlight_relevance is True and jd_text is provided, most/least relevant sections are bolded/italicized.
+    """
+    atomic_write(output_path, build_pdf_bytes(cv_text, section_titles, jd_text, highlight_relevance))
@@ -1,31 +1,64 @@
-from typing import Dict
-from sentence_transformers import SentenceTransformer, util
+from typing import Dict, Optional
 import numpy as np
 
-MODEL_NAME = 'all-MiniLM-L6-v2'
-model = SentenceTransformer(MODEL_NAME)
+from core.embeddings import MODEL_NAME, resolve_engine
 
-def match_score(cv_text, jd_text):
-    """Compute cosine similarity between the full CV and JD text."""
-    emb = model.encode([cv_text, jd_text], convert_to_tensor=True)
-    return util.pytorch_cos_sim(emb[0], emb[1]).item()
+# MiniLM on CPU keeps getting faster up to ~64 texts per forward pass; a
+# CV x JD analysis (JD + full CV + ~10 sections) then fits in one batch.
+ENCODE_BATCH_SIZE = 64
 
-def section_relevance(cv_sections: Dict[str, str], jd_text: str, model_name: str = 'all-MiniLM-L6-v2') -> Dict[str, float]:
+def match_score(cv_text, jd_text, model=None):
+    """Compute cosine similarity between the full CV and JD text (long texts are chunked, not truncated)."""
+    return resolve_engine(model, MODEL_NAME).similarity(cv_text, jd_text)
+
+def score_documents(cv_text: str, jd_text: str, cv_sections: Optional[Dict[str, str]] = None,
+                    model=None, batch_size: int = ENCODE_BATCH_SIZE) -> Dict:
+    """
+    Embed the JD, the full CV and every non-empty CV section in a single batched encode call
+    (long texts are chunked and pooled, see EmbeddingEngine.encode_documents).
+    Returns the raw cosine similarity of the whole CV, per-section cosine similarities,
+    and the JD, CV and section-pooled CV vectors derived from that one result matrix.
+    """
+    engine = resolve_engine(model, MODEL_NAME)
+    cv_sections = cv_sections or {}
+    names = [name for name, content in cv_sections.items() if content.strip()]
+    texts = [jd_text, cv_text] + [cv_sections[name] for name in names]
+    emb = engine.encode_documents(texts, batch_size=batch_size)
+
+    jd_vec, cv_vec, section_vecs = emb[0], emb[1], emb[2:]
+    sims = emb[1:] @ jd_vec
+    section_sims = {name: 0.0 for name in cv_sections}
+    section_sims.update({name: float(sim) for name, sim in zip(names, sims[1:])})
+
+    if len(section_vecs):
+        pooled = section_vecs.mean(axis=0)
+        pooled /= max(float(np.linalg.norm(pooled)), 1e-12)
+    else:
+        pooled = cv_vec
+    return {
+        'similarity': float(sims[0]),
+        'section_similarity': section_sims,
+        'jd_vector': jd_vec,
+        'cv_vector': cv_vec,
+        'pooled_cv_vector': pooled,
+    }
+
+def section_relevance(cv_sections: Dict[str, str], jd_text: str, model_name: str = MODEL_NAME, model=None) -> Dict[str, float]:
     """
     Scores each CV section for relevance to the job description using semantic similarity.
     Returns a dict of section_name: relevance_score (0-1).
     """
-    model = SentenceTransformer(model_name)
-    jd_emb = model.encode(jd_text, convert_to_tensor=True)
+    engine = resolve_engine(model, model_name)
+    names = [name for name, content in cv_sections.items() if content.strip()]
+    emb = engine.encode_documents([jd_text] + [cv_sections[name] for name in names], batch_size=ENCODE_BATCH_SIZE)
+    sims = dict(zip(names, emb[1:] @ emb[0]))
     scores = {}
-    for section, content in cv_sections.items():
-        if not content.strip():
+    for section in cv_sections:
+        if section not in sims:
             scores[section] = 0.0
             continue
-        section_emb = model.encode(content, convert_to_tensor=True)
-        sim = float(util.pytorch_cos_sim(section_emb, jd_emb).item())
         # Normalize to 0-1 (cosine sim is -1 to 1)
-        norm_score = (sim + 1) / 2
+        norm_score = (float(sims[section]) + 1) / 2
         scores[section] = round(norm_score, 3)
     return scores
 
@@ -0,0 +1,111 @@
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+# Part of the parsed-document cache key (core.document_cache): bump whenever a change here
+# alters what find_sections / extract_sections return for the same text
+SECTIONS_VERSION = 2
+
+# Known section headers, matched in any case after normalize_header
+SECTION_HEADERS = (
+    'professional summary', 'summary', 'profile', 'objective',
+    'experience', 'work experience', 'professional experience', 'additional experience',
+    'education', 'academic background',
+    'skills', 'technical skills', 'core competencies', 'skills & certifications', 'skills and certifications',
+    'certifications', 'projects', 'publications', 'languages', 'interests', 'awards', 'activities',
+    'volunteer', 'volunteering', 'extracurricular', 'extra curricular', 'additional / extra curricular experience',
+    'contact', 'personal information', 'references'
+)
+
+_NON_NEWLINE_BREAK = re.compile(r'\r\n|[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+_NON_ALNUM = re.compile(r'[^a-z0-9 ]+')
+# ALL CAPS line of letters, digits and common punctuation
+_CAPS_HEADER = re.compile(r"[A-Z0-9 &/().,'-]+")
+
+
+def normalize_header(line: str) -> str:
+    """Lowercase, spell out '&', drop punctuation and collapse whitespace, for header lookup."""
+    h = line.lower().replace('&', 'and').replace('/', ' ').replace('-', ' ')
+    return ' '.join(_NON_ALNUM.sub('', h).split())
+
+
+NORMALIZED_HEADERS = {normalize_header(h): h.title() for h in SECTION_HEADERS}
+# Normalizing keeps every ASCII letter and digit, so a line with more of them than the longest
+# known header cannot match one; this rejects most content lines without normalizing them.
+_MAX_HEADER_ALNUM = max(len(h.replace(' ', '')) for h in NORMALIZED_HEADERS)
+_NON_ASCII_ALNUM = bytes(c for c in range(128) if not chr(c).isalnum())
+
+
+def detect_header(line: str) -> Optional[str]:
+    """
+    Section name if line is a header, else None: a known header in any case, or an ALL CAPS
+    line with 2+ words (e.g. 'KEY ACHIEVEMENTS').
+    """
+    if (len(line) <= _MAX_HEADER_ALNUM
+            or len(line.encode('ascii', 'ignore').translate(None, _NON_ASCII_ALNUM)) <= _MAX_HEADER_ALNUM):
+        name = NORMALIZED_HEADERS.get(normalize_header(line))
+        if name is not None:
+            return name
+    stripped = line.strip()
+    # The character class already implies upper() == stripped; a space inside means 2+ words
+    if ' ' in stripped and _CAPS_HEADER.fullmatch(stripped):
+        return stripped.title()
+    return None
+
+
+class SectionSpan(NamedTuple):
+    """A section's name and the [start, end) offsets of its stripped content in the source text."""
+    name: str
+    start: int
+    end: int
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def find_sections(text: str) -> List[SectionSpan]:
+    """
+    One pass over text, returning a span per non-empty section in document order (a header may
+    repeat). Text without any header is one 'Full CV' span, even when empty.
+    """
+    spans = []
+    name, start, end = None, 0, 0
+    pos = 0
+    # Lines with and without their line breaks give each line's offsets without slicing text
+    for line, line_with_break in zip(text.splitlines(), text.splitlines(True)):
+        line_start, pos = pos, pos + len(line_with_break)
+        header = detect_header(line)
+        if header is None:
+            if name is not None and start is None:
+                start = line_start
+            end = line_start + len(line)
+            continue
+        if name is not None and start is not None:
+            span = _strip_span(text, start, end)
+            if span[0] < span[1]:
+                spans.append(SectionSpan(name, *span))
+        name, start = header, None
+    if name is None:
+        return [SectionSpan('Full CV', *_strip_span(text, 0, len(text)))]
+    if start is not None:
+        span = _strip_span(text, start, end)
+        if span[0] < span[1]:
+            spans.append(SectionSpan(name, *span))
+    return spans
+
+
+def section_text(text: str, span: SectionSpan) -> str:
+    """The content of span, with line breaks normalized to '\\n'."""
+    content = text[span.start:span.end]
+    return _NON_NEWLINE_BREAK.sub('\n', content) if _NON_NEWLINE_BREAK.search(content) else content
+
+
+@lru_cache(maxsize=32)
+def title_pattern(section_titles: Sequence[str]) -> Pattern:
+    """Header regex for a tuple of section titles (at line start, followed by ':' or a newline), compiled once."""
+    return re.compile(r'(^|\n)(' + '|'.join([re.escape(title) for title in section_titles]) + r')[:\n]', re.IGNORECASE)
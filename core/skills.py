@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SKILLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skills.json')
+_WHITESPACE = re.compile(r'\s')
+# Characters that continue a word: a term next to one is part of a longer token ('R' in 'R&D')
+_WORD_CHARS = frozenset('&_')
+# Case-sensitive terms are short words ('R', 'Go'), so a hyphen joins them to a longer word too
+# ('Go-to-market', 'R-squared'); other terms still match in 'Python-based'
+_EXACT_WORD_CHARS = _WORD_CHARS | {'-'}
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a fixed set of patterns: one pass over a text reports every
+    occurrence of every pattern, overlapping ones included, in time linear in the text length.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                child = self._goto[node].get(ch)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][ch] = child
+                node = child
+            self._out[node] += (index,)
+        # Breadth-first, so every node's failure target is finished before its children's
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (end offset, pattern index) for every occurrence, in order of end offset."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for index in out[node]:
+                    yield i + 1, index
+
+
+class SkillMatch(NamedTuple):
+    skill: str
+    start: int
+    end: int
+
+
+def _fold(text: str) -> str:
+    """Lowercase with every whitespace char as a space; offsets stay those of text."""
+    folded = _WHITESPACE.sub(' ', text.lower())
+    if len(folded) != len(text):
+        # A few characters lowercase to two (e.g. 'İ'); keep those as they are
+        folded = _WHITESPACE.sub(' ', ''.join(c if len(c.lower()) != 1 else c.lower() for c in text))
+    return folded
+
+
+def _is_word_char(ch: str, exact: bool = False) -> bool:
+    return ch.isalnum() or ch in (_EXACT_WORD_CHARS if exact else _WORD_CHARS)
+
+
+class SkillTaxonomy:
+    """
+    Canonical skills with aliases (core/skills.json), compiled into one Aho-Corasick automaton.
+    Terms match case-insensitively at word boundaries, except those listed under
+    'case_sensitive' (e.g. 'R', 'Go'), which must appear exactly as written.
+    """
+
+    def __init__(self, skills: Dict[str, Dict]):
+        self.names: List[str] = list(skills)
+        self.categories: List[str] = [skills[name].get('category', '') for name in self.names]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        terms, self._term_skill, self._exact = [], [], []
+        seen = {}
+        for i, name in enumerate(self.names):
+            entry = skills[name]
+            exact = set(entry.get('case_sensitive', ()))
+            for term in [name] + list(entry.get('aliases', ())):
+                key = _fold(term.strip())
+                if not key:
+                    continue
+                if key in seen:
+                    if seen[key] != i:
+                        logger.warning(f"Skill term '{term}' of {name} already belongs to {self.names[seen[key]]}")
+                    continue
+                seen[key] = i
+                terms.append(key)
+                self._term_skill.append(i)
+                self._exact.append(term.strip() if term in exact else None)
+        self.terms = terms
+        self._automaton = AhoCorasick(terms)
+        logger.info(f"Compiled {len(self.names)} skills ({len(terms)} terms, {len(self._automaton)} automaton states)")
+
+    @classmethod
+    def load(cls, path: str = SKILLS_PATH) -> 'SkillTaxonomy':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def find(self, text: str) -> List[SkillMatch]:
+        """
+        Every skill mention in text, in order: whole-word matches only, and where terms overlap
+        (e.g. 'SQL' inside 'SQL Server') the leftmost, then longest, wins.
+        """
+        folded = _fold(text)
+        n = len(folded)
+        candidates = []
+        for end, term in self._automaton.iter(folded):
+            start = end - len(self.terms[term])
+            exact = self._exact[term]
+            strict = exact is not None
+            if (start > 0 and _is_word_char(folded[start - 1], strict)
+                    or end < n and _is_word_char(folded[end], strict)):
+                continue
+            if strict and text[start:end] != exact:
+                continue
+            candidates.append((start, -end, term))
+        candidates.sort()
+        matches, last_end = [], 0
+        for start, neg_end, term in candidates:
+            if start >= last_end:
+                matches.append(SkillMatch(self.names[self._term_skill[term]], start, -neg_end))
+                last_end = -neg_end
+        return matches
+
+    def counts(self, text: str) -> np.ndarray:
+        """Mentions per skill, as a vector aligned with self.names."""
+        vector = np.zeros(len(self.names), dtype=np.int32)
+        for match in self.find(text):
+            vector[self.index[match.skill]] += 1
+        return vector
+
+    def skill_names(self, vector: np.ndarray) -> List[str]:
+        """Names of the skills with a positive entry in vector, most mentioned first."""
+        nonzero = np.flatnonzero(vector > 0)
+        return [self.names[i] for i in nonzero[np.argsort(-vector[nonzero], kind='stable')]]
+
+
+_taxonomy: Optional[SkillTaxonomy] = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_skill_taxonomy() -> SkillTaxonomy:
+    """The process-wide taxonomy, from OPERATIONCV_SKILLS if set, else core/skills.json."""
+    global _taxonomy
+    if _taxonomy is None:
+        with _taxonomy_lock:
+            if _taxonomy is None:
+                _taxonomy = SkillTaxonomy.load(os.environ.get('OPERATIONCV_SKILLS', SKILLS_PATH))
+    return _taxonomy
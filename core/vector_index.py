@@ -0,0 +1,266 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.applications import ApplicationRepository, get_repository
+
+logger = logging.getLogger(__name__)
+
+INDEX_MODES = ('exact', 'ivf', 'auto')
+# 'auto' switches from exact search to IVF above this many vectors
+IVF_THRESHOLD = int(os.environ.get('OPERATIONCV_IVF_THRESHOLD', 50000))
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 10
+# Centroids are trained on at most this many vectors per list
+KMEANS_SAMPLE_PER_LIST = 64
+# Rows scored per matrix multiply, bounding temporary memory
+SEARCH_CHUNK = 65536
+
+
+class VectorIndex:
+    """
+    In-memory nearest-neighbour index over L2-normalized vectors (cosine = dot product).
+    'exact' scores every vector with one matrix-vector product; 'ivf' clusters the vectors with
+    spherical k-means and scores only the nprobe closest clusters. 'auto' is exact until
+    IVF_THRESHOLD vectors. The IVF lists are retrained once the index has doubled in size.
+    """
+
+    def __init__(self, dim: Optional[int] = None, mode: str = 'auto', nprobe: int = DEFAULT_NPROBE,
+                 nlist: Optional[int] = None):
+        if mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode: {mode}")
+        self.dim = dim
+        self.mode = mode
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+        self._trained_size = 0
+        # Row of each id in _ids / _vectors
+        self._rows: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray):
+        """
+        Append vectors (rows) with their ids; storage grows geometrically. An id already in the
+        index has its vector replaced in place.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if not len(vectors):
+            return
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            if self.dim is None or not self._size:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+            rows = np.fromiter((self._rows.get(int(i), -1) for i in ids), dtype=np.int64, count=len(ids))
+            known = rows >= 0
+            if known.any():
+                self._replace(rows[known], vectors[known])
+                ids, vectors = ids[~known], vectors[~known]
+                if not len(ids):
+                    return
+            needed = self._size + len(vectors)
+            if needed > len(self._ids) or self._vectors.shape[1] != self.dim:
+                capacity = max(needed, 2 * len(self._ids), 1024)
+                grown_ids = np.empty(capacity, dtype=np.int64)
+                grown = np.empty((capacity, self.dim), dtype=np.float32)
+                if self._size:
+                    grown_ids[:self._size] = self.ids
+                    grown[:self._size] = self.vectors
+                self._ids, self._vectors = grown_ids, grown
+            self._ids[self._size:needed] = ids
+            self._vectors[self._size:needed] = vectors
+            self._rows.update((int(i), row) for row, i in enumerate(ids, self._size))
+            start, self._size = self._size, needed
+            if self._centroids is not None:
+                self._assign(start, needed)
+
+    def _replace(self, rows: np.ndarray, vectors: np.ndarray):
+        self._vectors[rows] = vectors
+        if self._centroids is not None:
+            self._assignments[rows] = np.argmax(vectors @ self._centroids.T, axis=1)
+            self._build_lists()
+
+    def _use_ivf(self) -> bool:
+        return self.mode == 'ivf' or (self.mode == 'auto' and self._size >= IVF_THRESHOLD)
+
+    def train(self, seed: int = 0):
+        """Spherical k-means on a sample of the vectors, then assign every vector to a list."""
+        with self._lock:
+            n = self._size
+            if not n:
+                return
+            nlist = self.nlist or max(1, int(np.sqrt(n)))
+            nlist = min(nlist, n)
+            rng = np.random.default_rng(seed)
+            sample = self.vectors[rng.choice(n, size=min(n, nlist * KMEANS_SAMPLE_PER_LIST), replace=False)]
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                # Empty clusters keep their previous centroid
+                centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+            self._centroids = centroids.astype(np.float32)
+            self._assignments = np.empty(0, dtype=np.int32)
+            self._assign(0, n)
+            self._trained_size = n
+            logger.info(f"Trained IVF index: {nlist} lists over {n} vectors")
+
+    def _assign(self, start: int, stop: int):
+        labels = np.concatenate([
+            np.argmax(self._vectors[i:min(i + SEARCH_CHUNK, stop)] @ self._centroids.T, axis=1)
+            for i in range(start, stop, SEARCH_CHUNK)
+        ]).astype(np.int32)
+        self._assignments = np.concatenate([self._assignments, labels])
+        self._build_lists()
+
+    def _build_lists(self):
+        order = np.argsort(self._assignments, kind='stable')
+        bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self._centroids))]
+
+    def search(self, query: np.ndarray, k: int = 5, exclude: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        """Top-k (id, cosine similarity) for a normalized query vector, best first."""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        with self._lock:
+            if not self._size:
+                return []
+            if self._use_ivf():
+                if self._centroids is None or self._size > 2 * self._trained_size:
+                    self.train()
+                probes = np.argsort(-(self._centroids @ query))[:self.nprobe]
+                rows = np.concatenate([self._lists[c] for c in probes])
+                scores = self._vectors[rows] @ query
+            else:
+                rows = None
+                scores = np.concatenate([
+                    self._vectors[i:min(i + SEARCH_CHUNK, self._size)] @ query
+                    for i in range(0, self._size, SEARCH_CHUNK)
+                ])
+            ids = self._ids[rows] if rows is not None else self.ids
+        if len(exclude):
+            scores = np.where(np.isin(ids, exclude), -np.inf, scores)
+        k = min(k, len(scores))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+class ApplicationIndex:
+    """
+    Finds past applications with job descriptions similar to a new one. JDs are embedded
+    whole, in chunks (EmbeddingEngine.encode_documents), both when stored and when queried.
+    The embeddings are stored with each application (ApplicationRepository.save_embeddings)
+    and mirrored in a VectorIndex; rows saved by other processes are picked up on the next query.
+    """
+
+    def __init__(self, repository: Optional[ApplicationRepository] = None, model=None, mode: str = 'auto',
+                 nprobe: int = DEFAULT_NPROBE):
+        from core.embeddings import resolve_engine
+        self.repository = repository or get_repository()
+        self.engine = resolve_engine(model)
+        self.index = VectorIndex(mode=mode, nprobe=nprobe)
+        # Latest embedding version loaded (ApplicationRepository.load_embeddings)
+        self._version = -1
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        # Keyed like the embedding cache, so int8 vectors are stored and searched apart from fp32 ones,
+        # plus the chunk pooling: whole-document vectors replace any stored from a JD's head alone
+        from core.embeddings import POOLING
+        return f"{self.engine.cache_name}:{POOLING}-chunks"
+
+    def refresh(self):
+        """
+        Load embeddings saved or replaced since the last refresh (replacing the old vectors of
+        re-saved applications); rebuild if applications or their embeddings were deleted.
+        """
+        with self._lock:
+            ids, vectors, self._version = self.repository.load_embeddings(self.model_name, since=self._version)
+            self.index.add(ids, vectors)
+            # Every stored embedding is now in the index, so any extra entry belongs to a deleted row
+            if len(self.index) > self.repository.embedding_count(self.model_name):
+                self.index = VectorIndex(mode=self.index.mode, nprobe=self.index.nprobe)
+                ids, vectors, self._version = self.repository.load_embeddings(self.model_name)
+                self.index.add(ids, vectors)
+
+    def add(self, application_ids: Sequence[int], jd_texts: Sequence[str]):
+        """Embed and store the JDs of newly saved applications."""
+        if not len(application_ids):
+            return
+        vectors = self.engine.encode_documents(list(jd_texts))
+        self.repository.save_embeddings(application_ids, vectors, self.model_name)
+        self.refresh()
+
+    def backfill(self, batch_size: int = 256) -> int:
+        """Embed applications saved without an embedding (or with another model's); returns the count."""
+        total = 0
+        while True:
+            missing = self.repository.missing_embeddings(self.model_name, limit=batch_size)
+            if not missing:
+                return total
+            ids, texts = zip(*missing)
+            self.repository.save_embeddings(ids, self.engine.encode_documents(list(texts)), self.model_name)
+            total += len(ids)
+            logger.info(f"Backfilled {total} application embeddings")
+
+    def similar(self, jd_text: str, k: int = 5, exclude: Sequence[int] = (),
+                columns: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        The k past applications whose JD is most similar to jd_text, best first; each row
+        (all columns unless columns is given) carries a 'similarity' in [-1, 1].
+        """
+        self.refresh()
+        start = time.perf_counter()
+        hits = self.index.search(self.engine.encode_documents([jd_text])[0], k, exclude)
+        logger.info(f"Vector search over {len(self.index)} JDs took {(time.perf_counter() - start) * 1000:.1f} ms")
+        rows = self.repository.get_many([i for i, _ in hits], columns)
+        return [{**rows[i], 'similarity': round(score, 4)} for i, score in hits if i in rows]
+
+
+_index: Optional[ApplicationIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_application_index() -> ApplicationIndex:
+    """
+    Process-wide index over the default repository and embedding engine. Applications saved
+    without an embedding for this engine (e.g. before embeddings were stored) are embedded
+    on first use.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = ApplicationIndex(mode=os.environ.get('OPERATIONCV_VECTOR_INDEX', 'auto'))
+                index.backfill()
+                _index = index
+    return _index
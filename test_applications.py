@@ -0,0 +1,88 @@
+import sqlite3
+
+from core.applications import ApplicationRepository
+
+
+def _application(title, jd_text, created_at, **extra):
+    return {'job_title': title, 'company': 'Acme', 'industry': 'Tech', 'jd_text': jd_text,
+            'cv_text': 'Data analyst with SQL and Power BI', 'tailored_cv': None, 'created_at': created_at, **extra}
+
+
+def test_migrates_legacy_plain_text_rows(tmp_path):
+    db = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(db)
+    conn.execute('''CREATE TABLE job_applications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, job_title TEXT, company TEXT, industry TEXT, jd_text TEXT,
+        cv_text TEXT, tailored_cv TEXT, prob_before REAL, prob_after REAL, created_at TEXT
+    )''')
+    jd_text = 'Looking for a data engineer to build Kafka pipelines. ' * 20
+    conn.executemany(
+        'INSERT INTO job_applications (job_title, company, jd_text, cv_text, tailored_cv, created_at) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        [('Data Engineer', 'Acme', jd_text, 'Same CV', 'Tailored CV', '2024-01-01'),
+         ('Analyst', 'Beta', 'Power BI reporting', 'Same CV', None, '2024-01-02')],
+    )
+    conn.commit()
+    conn.close()
+
+    repository = ApplicationRepository(db)
+    first = repository.get(1)
+    assert first['jd_text'] == jd_text
+    assert first['cv_text'] == 'Same CV'
+    assert first['tailored_cv'] == 'Tailored CV'
+    # The long JD is stored compressed and both rows share one stored CV
+    raw = repository.connection().execute('SELECT jd_text, cv_text FROM job_applications WHERE id = 1').fetchone()
+    assert isinstance(raw['jd_text'], bytes) and raw['cv_text'] is None
+    assert repository.connection().execute('SELECT COUNT(*) FROM cv_texts').fetchone()[0] == 1
+    assert [row['id'] for row in repository.search('kafka')] == [1]
+    repository.close()
+
+
+def test_upsert_replaces_row_and_search_entry(tmp_path):
+    repository = ApplicationRepository(str(tmp_path / 'apps.db'))
+    first = repository.upsert('pair-1', _application('Chef', 'Classic French sauces', '2024-01-01'))
+    second = repository.upsert('pair-1', _application('Chef', 'Laminated pastry doughs', '2024-01-02'))
+    assert first == second
+    assert repository.count() == 1
+    assert repository.search('sauces') == []
+    assert [row['id'] for row in repository.search('pastry')] == [first]
+    repository.close()
+
+
+def test_search_index_follows_writes_from_other_clients(tmp_path):
+    db = str(tmp_path / 'apps.db')
+    repository = ApplicationRepository(db)
+    kept = repository.add(_application('Data Engineer', 'Kafka pipelines', '2024-01-01'))
+    removed = repository.add(_application('Nurse', 'Ward rounds', '2024-01-02'))
+
+    # No unpack_text function on this connection: plain SQL writes must still work
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE job_applications SET job_title = 'Platform Engineer' WHERE id = ?", (kept,))
+    conn.execute('DELETE FROM job_applications WHERE id = ?', (removed,))
+    conn.execute("INSERT INTO job_applications (job_title, jd_text, created_at) VALUES ('Pilot', 'Flying jets', '2024-01-03')")
+    conn.commit()
+    conn.close()
+
+    assert [row['id'] for row in repository.search('platform')] == [kept]
+    assert repository.search('ward') == []
+    assert len(repository.search('jets')) == 1
+    repository.close()
+
+
+def test_keyset_pagination_visits_every_row_once(tmp_path):
+    repository = ApplicationRepository(str(tmp_path / 'apps.db'))
+    # Several rows share a created_at, so the id tie-break matters
+    repository.add_many([_application(f'Job {i}', f'Description {i}', f'2024-01-{i // 3 + 1:02d}') for i in range(10)])
+    seen, cursor = [], None
+    while True:
+        page = repository.list(limit=3, after=cursor, columns=('id', 'created_at'))
+        seen.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == sorted(seen, key=lambda i: (repository.get(i)['created_at'], i), reverse=True)
+    assert sorted(seen) == list(range(1, 11))
+
+    tech = repository.list(limit=20, industry='Tech')
+    assert len(tech['items']) == 10 and tech['next_cursor'] is None
+    repository.close()
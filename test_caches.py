@@ -0,0 +1,58 @@
+import numpy as np
+
+import core.document_cache as document_cache
+from core.cv_handler import load_document
+from core.document_cache import buffer_digest, file_digest
+from core.embedding_cache import EmbeddingCache, cache_key
+from core.embeddings import EmbeddingEngine
+
+
+def test_embedding_keys_are_salted_with_the_model():
+    assert cache_key('model-a', 'Python  developer\n') == cache_key('model-a', 'Python developer')
+    assert cache_key('model-a', 'Python developer') != cache_key('model-b', 'Python developer')
+    # int8 vectors are cached apart from full-precision ones of the same model
+    names = {EmbeddingEngine('m', backend=backend).cache_name for backend in ('torch', 'onnx', 'onnx-int8')}
+    assert names == {'m', 'm@onnx-int8'}
+
+
+def test_embedding_cache_serves_only_the_same_model(tmp_path):
+    cache = EmbeddingCache(max_items=8, db_path=str(tmp_path / 'embeddings.db'))
+    vector = np.ones((1, 4), dtype=np.float32) / 2
+    cache.put_many('model-a', ['Python developer'], vector)
+    assert cache.get_many('model-b', ['Python developer']) == [None]
+    np.testing.assert_array_equal(cache.get_many('model-a', ['Python developer'])[0], vector[0])
+    # The on-disk tier is keyed the same way
+    reopened = EmbeddingCache(max_items=8, db_path=str(tmp_path / 'embeddings.db'))
+    assert reopened.get_many('model-b', ['Python developer']) == [None]
+    assert reopened.get_many('model-a', ['Python developer'])[0] is not None
+
+
+def test_document_digest_is_salted_with_extension_and_parser_version(tmp_path):
+    path = tmp_path / 'upload'
+    path.write_bytes(b'SKILLS\nPython')
+    assert file_digest(str(path), '.txt') == buffer_digest(b'SKILLS\nPython', '.txt')
+    assert file_digest(str(path), '.txt') != file_digest(str(path), '.pdf')
+    named = tmp_path / 'cv.TXT'
+    named.write_bytes(b'SKILLS\nPython')
+    assert file_digest(str(named)) == file_digest(str(path), '.txt')
+
+    before = file_digest(str(path), '.txt')
+    version = document_cache.PARSER_VERSION
+    document_cache.PARSER_VERSION = version + '-next'
+    try:
+        assert file_digest(str(path), '.txt') != before
+    finally:
+        document_cache.PARSER_VERSION = version
+
+
+def test_cached_parse_is_not_served_for_another_parser(tmp_path):
+    path = tmp_path / 'upload'
+    path.write_bytes(b'SKILLS\nPython and SQL')
+    text, sections = load_document(str(path), '.txt')
+    assert sections == {'Skills': 'Python and SQL'}
+    try:
+        load_document(str(path), '.pdf')
+    except Exception:
+        pass
+    else:
+        raise AssertionError("text cached from the .txt parse was served for .pdf")
@@ -0,0 +1,39 @@
+from core.chunking import chunk_text
+
+
+def count_words(texts):
+    return [len(text.split()) for text in texts]
+
+
+def _check(text, max_tokens):
+    chunks = chunk_text(text, max_tokens, count_words)
+    for chunk, tokens in chunks:
+        assert tokens == len(chunk.split())
+        assert tokens <= max_tokens
+    # Every word survives, in order
+    assert [w for chunk, _ in chunks for w in chunk.split()] == text.split()
+    return chunks
+
+
+def test_text_that_fits_is_one_chunk():
+    text = 'Python developer. Five years of SQL.'
+    assert chunk_text(text, 50, count_words) == [(text, 6)]
+
+
+def test_chunks_stay_within_max_tokens():
+    sentences = ' '.join(f'Built pipeline number {i} with Python and SQL.' for i in range(40))
+    text = f"PROFESSIONAL SUMMARY\n{sentences}\nEXPERIENCE\n{sentences}"
+    chunks = _check(text, 30)
+    assert len(chunks) > 2
+
+
+def test_new_section_starts_a_chunk():
+    text = 'SKILLS\nPython SQL Tableau.\nEXPERIENCE\nLed analytics at Acme.'
+    chunks = _check(text, 6)
+    assert chunks[1][0].startswith('EXPERIENCE')
+
+
+def test_overlong_sentence_is_split_by_words_and_keeps_its_header():
+    sentence = ' '.join(f'word{i}' for i in range(95))
+    chunks = _check(f"EXPERIENCE\n{sentence}", 20)
+    assert chunks[0][0].startswith('EXPERIENCE\nword0')
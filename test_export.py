@@ -0,0 +1,65 @@
+import os
+
+from docx import Document
+
+from core.export import TemplateCache, export_many
+
+
+def _write_template(path, *lines):
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    doc.save(str(path))
+
+
+def _set_mtime(path, mtime_ns):
+    os.utime(str(path), ns=(mtime_ns, mtime_ns))
+
+
+def test_template_is_compiled_once_until_it_changes(tmp_path):
+    path = tmp_path / 'cv.docx'
+    _write_template(path, '{{ summary }}')
+    _set_mtime(path, 1_000_000_000_000_000_000)
+    cache = TemplateCache()
+    first = cache.get(str(path))
+    assert first.variables == {'summary'}
+    assert cache.get(str(path)) is first
+
+    # A newer file is recompiled
+    _write_template(path, '{{ summary }}', '{{ skills }}')
+    _set_mtime(path, 1_000_000_001_000_000_000)
+    second = cache.get(str(path))
+    assert second is not first
+    assert second.variables == {'summary', 'skills'}
+
+    # So is a file that kept its mtime but changed size
+    _write_template(path, '{{ summary }}', '{{ skills }}', '{{ education }} and a longer line of text')
+    _set_mtime(path, 1_000_000_001_000_000_000)
+    third = cache.get(str(path))
+    assert third is not second
+    assert 'education' in third.variables
+
+
+def test_template_without_section_variables_is_rejected(tmp_path):
+    path = tmp_path / 'plain.docx'
+    _write_template(path, 'No placeholders here')
+    try:
+        TemplateCache().get(str(path))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("template without CV section variables was accepted")
+
+
+def test_export_many_renders_every_job(tmp_path):
+    template = tmp_path / 'cv.docx'
+    _write_template(template, '{{ summary }}', '{{ skills }}')
+    cv_text = 'SUMMARY\nData analyst.\nSKILLS\nPython, SQL'
+    jobs = [(cv_text, str(tmp_path / f'cv_{i}.docx')) for i in range(3)] + [(cv_text, str(tmp_path / 'cv.pdf'))]
+    results = export_many(jobs, template=str(template), workers=1)
+    assert [r['error'] for r in results] == [None] * 4
+    text = '\n'.join(p.text for p in Document(str(tmp_path / 'cv_0.docx')).paragraphs)
+    assert 'Data analyst.' in text and 'Python, SQL' in text
+    assert (tmp_path / 'cv.pdf').read_bytes().startswith(b'%PDF')
+    # Outputs are written atomically: no temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == sorted(['cv.docx', 'cv.pdf'] + [f'cv_{i}.docx' for i in range(3)])
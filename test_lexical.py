@@ -0,0 +1,51 @@
+import numpy as np
+
+from core.lexical import LexicalIndex
+
+REFERENCE = [
+    'Data analyst with SQL and Power BI reporting experience',
+    'Software engineer building Python services on AWS',
+    'Nurse for ward rounds and patient care',
+    'Data engineer with Python, SQL and Kafka pipelines',
+]
+CV = 'Analyst skilled in SQL, Python and Power BI dashboards'
+JD = 'We need a data analyst with SQL, Power BI and Tableau'
+
+
+def test_idf_ranks_rare_terms_higher():
+    index = LexicalIndex()
+    assert index.add(REFERENCE) == len(REFERENCE)
+    # Adding a JD again does not count it twice
+    assert index.add(REFERENCE[:1]) == 0
+    idf = dict(zip(index.vocabulary, index.idf()))
+    assert idf['kafka'] > idf['sql'] > 0
+
+
+def test_saved_index_scores_like_the_original(tmp_path):
+    index = LexicalIndex()
+    index.add(REFERENCE)
+    path = str(tmp_path / 'lexical_index.npz')
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.vocabulary == index.vocabulary
+    np.testing.assert_allclose(loaded.idf(), index.idf())
+    np.testing.assert_allclose(loaded.scores([CV], [JD]), index.scores([CV], [JD]))
+
+
+def test_scores_do_not_depend_on_other_scored_texts():
+    index = LexicalIndex()
+    index.add(REFERENCE)
+    alone = index.scores([CV], [JD])[0, 0]
+    together = index.scores([CV, 'Chef cooking sauces'], [JD, 'Pastry chef with bakery experience'])
+    assert 0 < alone <= 1
+    assert together[0, 0] == alone
+    # Scoring never grows the reference corpus
+    assert len(index) == len(REFERENCE)
+    assert index.scores([CV], [JD])[0, 0] == alone
+
+
+def test_cv_without_shared_terms_scores_zero():
+    index = LexicalIndex()
+    index.add(REFERENCE)
+    assert index.scores(['Pastry chef'], [JD])[0, 0] == 0
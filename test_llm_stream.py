@@ -0,0 +1,46 @@
+import json
+
+from core.llm_stream import SectionStreamParser, ThinkStripper
+
+
+def _feed_in_chunks(text, size):
+    parser = SectionStreamParser()
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    return parser
+
+
+def test_parses_escapes_and_unicode_split_across_chunks():
+    sections = {
+        'summary': 'Led a "data" team\nacross EU\tsites \\ HQ',
+        'skills': 'Café, naïve Bayes, 数据, emoji 🚀',
+    }
+    # ensure_ascii turns the non-ASCII text into \u escapes, the emoji into a surrogate pair
+    text = json.dumps({'sections': sections}, ensure_ascii=True)
+    for size in (1, 2, 3, 5, 7, len(text)):
+        assert _feed_in_chunks(text, size).sections == sections
+
+
+def test_partial_section_is_visible_while_generating():
+    parser = SectionStreamParser()
+    parser.feed('{"sections": {"summary": "Analyst with 5 yea')
+    assert parser.sections == {'summary': 'Analyst with 5 yea'}
+    assert parser.open_section == 'summary'
+    parser.feed('rs", "skills": "SQL\\')
+    assert parser.sections == {'summary': 'Analyst with 5 years', 'skills': 'SQL'}
+    parser.feed('u00e9"}}')
+    assert parser.sections['skills'] == 'SQLé'
+    assert parser.open_section is None
+
+
+def test_ignores_keys_outside_sections():
+    parser = SectionStreamParser()
+    parser.feed('{"note": "ignore me", "sections": {"summary": "Kept"}, "extra": "also ignored"}')
+    assert parser.sections == {'summary': 'Kept'}
+
+
+def test_think_blocks_are_stripped_across_chunks():
+    stripper = ThinkStripper()
+    chunks = ['Hello <thi', 'nk>hidden reasoning</th', 'ink> world']
+    visible = ''.join(stripper.feed(chunk) for chunk in chunks) + stripper.flush()
+    assert visible == 'Hello  world'
@@ -0,0 +1,18 @@
+from core.probability import extract_skills_and_requirements
+
+
+def test_case_sensitive_terms_skip_hyphenated_words():
+    skills = extract_skills_and_requirements(
+        "Led the Go-to-market plan and reported R-squared values for R&D.")
+    assert 'Go' not in skills
+    assert 'R' not in skills
+
+
+def test_case_sensitive_terms_match_whole_words():
+    skills = extract_skills_and_requirements("Backend services in Go; statistical models in R.")
+    assert 'Go' in skills
+    assert 'R' in skills
+
+
+def test_hyphen_still_ends_other_terms():
+    assert 'Python' in extract_skills_and_requirements("Built Python-based ETL pipelines.")